@@ -1,8 +1,16 @@
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+import hmac
+import os
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
-from typing import List, Optional
-from game_manager import game_manager
+from typing import Dict, List, Optional
+from game_manager import CorpusDeltaRejected, game_manager
+from session_store import SessionConflict
+from song_catalog import accepts_gzip, parse_fields
+from executors import Overloaded, executors
+from metrics import registry
 
 app = FastAPI(title="Taylor Swift Lyric Guesser API", version="1.0.0")
 
@@ -15,12 +23,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def env_flag(name: str) -> bool:
+    """An on/off env var; unset, empty, 0, false and no all mean off (as ProfilingConfig reads it)."""
+    return os.environ.get(name, "").strip().lower() not in ("", "0", "false", "no")
+
+# Opt-in request profiling; the module isn't even imported unless asked for
+if env_flag("PROFILE_REQUESTS") or os.environ.get("PROFILE_ADMIN_TOKEN"):
+    from profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
 class GameQuestion(BaseModel):
     incomplete_lyric: str
     correct_answer: str
     options: List[str]
     question_id: str
 
+class GameQuestionBatch(BaseModel):
+    questions: List[GameQuestion]
+
 class GameAnswer(BaseModel):
     session_id: str
     selected_answer: str
@@ -29,18 +49,72 @@ class GameStats(BaseModel):
     vocabulary_size: int
     ngram_count: int
     total_ngrams: int
+    orders: Optional[Dict[int, Dict[str, int]]] = None
+    catalog_version: Optional[int] = None
+    song_index: Optional[Dict] = None
+    question_pool: Optional[Dict] = None
+    sessions: Optional[Dict] = None
+    executors: Optional[Dict] = None
 
 class SessionStats(BaseModel):
     score: int
     questions_answered: int
     accuracy: float
 
+class CorpusDelta(BaseModel):
+    albums: Optional[List[Dict]] = None
+    lines: Optional[Dict[str, str]] = None
+
+async def offload(endpoint: str, fn, *args, needs_model: bool = True):
+    """Run blocking game logic off the event loop (see executors.py).
+    Answers 503 while the model is still loading (see /ready).
+    """
+    if needs_model and not game_manager.ready:
+        game_manager.start_loading()
+        raise HTTPException(status_code=503, detail=f"Game model is not ready ({game_manager.phase})",
+                            headers={"Retry-After": "1"})
+    try:
+        return await executors.run(endpoint, fn, *args)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except SessionConflict as e:
+        # Concurrent requests for one session kept overwriting each other; the client may retry
+        raise HTTPException(status_code=409, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Timed out handling {endpoint} request")
+
+@app.on_event("startup")
+async def start_loading_model():
+    # Load in the background so the server accepts connections (and /ready) right away
+    game_manager.start_loading()
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    executors.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Taylor Swift Lyric Guesser API"}
 
+@app.get("/ready")
+async def readiness():
+    """200 once questions can be served, 503 while the model is still loading."""
+    status = game_manager.readiness()
+    if not status["ready"]:
+        game_manager.start_loading()
+        return JSONResponse(status, status_code=503)
+    return status
+
+@app.get("/livez")
+async def liveness():
+    """200 while the process serves requests at all; touches neither the model nor the executors."""
+    return {"status": "alive"}
+
 @app.get("/health")
 async def health_check():
+    """200 once the model is loaded. Reads the model's stats snapshot, so it is O(1)."""
+    if not game_manager.ready:
+        raise HTTPException(status_code=503, detail=f"Game model is not ready ({game_manager.phase})")
     try:
         stats = game_manager.get_model_stats()
         return {"status": "healthy", "model_loaded": True, "vocabulary_size": stats["vocabulary_size"]}
@@ -50,17 +124,31 @@ async def health_check():
 @app.get("/stats", response_model=GameStats)
 async def get_stats():
     try:
-        stats = game_manager.get_model_stats()
-        return GameStats(**stats)
+        stats = await offload("stats", game_manager.get_model_stats)
+        return GameStats(**stats, catalog_version=game_manager.catalog_version,
+                         song_index=game_manager.get_song_index_stats(), question_pool=game_manager.get_pool_stats(), sessions=game_manager.get_session_store_stats(),
+                         executors=executors.stats())
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text-format metrics (404 when METRICS_ENABLED=0)."""
+    if not registry.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    body = await offload("stats", registry.render, needs_model=False)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/session")
 async def create_session():
     """Create a new game session."""
     try:
-        session_id = game_manager.create_session()
+        session_id = await offload("session", game_manager.create_session, needs_model=False)
         return {"session_id": session_id, "message": "Session created successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating session: {str(e)}")
 
@@ -72,7 +160,7 @@ async def get_question(session_id: str, song: str | None = Query(default=None),
     - part: difficulty or song part (easy->Chorus, medium->Verse, hard/difficult->Bridge)
     """
     try:
-        question = game_manager.get_question(session_id, song=song, part=part)
+        question = await offload("question", game_manager.get_question, session_id, song, part)
         if not question:
             raise HTTPException(status_code=404, detail="Session not found or could not generate question")
         
@@ -83,20 +171,72 @@ async def get_question(session_id: str, song: str | None = Query(default=None),
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating question: {str(e)}")
 
+@app.get("/questions/{session_id}", response_model=GameQuestionBatch)
+async def get_questions(session_id: str, count: int = Query(default=5, ge=1, le=50), song: str | None = Query(default=None), part: str | None = Query(default=None)):
+    """Get `count` questions in one round trip.
+    They are queued on the session: /check-answer validates them one by one in the order returned.
+    Accepts the same song/part filters as /question.
+    """
+    try:
+        questions = await offload("questions", game_manager.get_questions, session_id, count, song, part)
+        if not questions:
+            raise HTTPException(status_code=404, detail="Session not found or could not generate questions")
+        
+        return GameQuestionBatch(questions=[GameQuestion(**q) for q in questions])
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating questions: {str(e)}")
+
 @app.get("/songs")
-async def list_songs():
-    """List available songs with album and parts."""
+async def list_songs(request: Request):
+    """List available songs with album and parts.
+    Pre-rendered once per catalogue version; answers 304 to a matching If-None-Match.
+    """
     try:
-        songs = game_manager.list_songs()
-        return {"songs": songs}
+        rendered = game_manager.cached_songs_response() if game_manager.ready else None
+        if rendered is None:
+            rendered = await offload("songs", game_manager.songs_response)
+        use_gzip = rendered.gzip_body is not None and accepts_gzip(request.headers.get("accept-encoding"))
+        headers = {"ETag": rendered.gzip_etag if use_gzip else rendered.etag,
+                   "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if rendered.not_modified(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(rendered.gzip_body, media_type="application/json", headers=headers)
+        return Response(rendered.body, media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing songs: {str(e)}")
 
+@app.get("/songs/search")
+async def search_songs(q: str = Query(default="", max_length=200), offset: int = Query(default=0, ge=0),
+                       limit: int = Query(default=20, ge=1, le=100), fields: str | None = Query(default=None)):
+    """Search song titles and album names (prefix and typo tolerant), one page at a time.
+    `fields` is a comma-separated subset of title, album, parts.
+    """
+    try:
+        projection = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        index = game_manager.cached_song_search() if game_manager.ready else None
+        if index is None:
+            index = await offload("songs", game_manager.song_search)
+        return index.page(q, offset, limit, projection)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching songs: {str(e)}")
+
 @app.post("/check-answer")
 async def check_answer(answer: GameAnswer):
     """Check if the selected answer is correct for the current session question."""
     try:
-        result = game_manager.check_answer(answer.session_id, answer.selected_answer)
+        result = await offload("check_answer", game_manager.check_answer, answer.session_id, answer.selected_answer, needs_model=False)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -112,7 +252,7 @@ async def check_answer(answer: GameAnswer):
 async def get_session_stats(session_id: str):
     """Get statistics for a specific session."""
     try:
-        stats = game_manager.get_session_stats(session_id)
+        stats = await offload("session", game_manager.get_session_stats, session_id, needs_model=False)
         if not stats:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -127,7 +267,7 @@ async def get_session_stats(session_id: str):
 async def delete_session(session_id: str):
     """Delete a game session."""
     try:
-        success = game_manager.cleanup_session(session_id)
+        success = await offload("session", game_manager.cleanup_session, session_id, needs_model=False)
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -138,6 +278,27 @@ async def delete_session(session_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting session: {str(e)}")
 
+@app.post("/admin/corpus")
+async def apply_corpus_delta(delta: CorpusDelta, x_admin_token: str | None = Header(default=None)):
+    """Add new albums (album-song-lyrics.json format) and/or flat lyric lines to the running game.
+    Disabled (404) unless CORPUS_ADMIN_TOKEN is set; the X-Admin-Token header must match it.
+    Answers 409 with several workers or process executors, which a delta would leave out of sync.
+    """
+    token = os.environ.get("CORPUS_ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Constant-time; bytes, because compare_digest rejects non-ASCII str
+    if not hmac.compare_digest((x_admin_token or "").encode("utf-8"), token.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        return await offload("corpus", game_manager.apply_corpus_delta, delta.albums, delta.lines)
+    except CorpusDeltaRejected as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying corpus delta: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,88 @@
+"""Manifest of the prepared corpus files, written by prepare_corpus.py.
+
+`runtime` records every file the server reads at startup (the model's source files, i.e. the
+album JSON and metadata TSVs, plus the model artifact) with its SHA-256, size and mtime.
+The runtime only needs stale_files(): a stat per file, plus a hash when size or mtime changed.
+`steps` is prepare_corpus.py's own bookkeeping for skipping unchanged pickle steps.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PROCESSED_DIR = PROJECT_ROOT / "data" / "processed"
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_record(path, sha256: Optional[str] = None) -> Dict:
+    """What the manifest stores about one file; the hash is computed unless given."""
+    path = Path(path)
+    stat = path.stat()
+    return {
+        "path": os.path.relpath(path, PROJECT_ROOT),
+        "sha256": sha256 or file_sha256(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def file_changed(record: Dict) -> bool:
+    """Whether the file no longer matches its record. Only hashes it when size or mtime moved."""
+    path = PROJECT_ROOT / record["path"]
+    try:
+        stat = path.stat()
+    except OSError:
+        return True
+    if stat.st_size != record["size"]:
+        return True
+    if stat.st_mtime_ns == record["mtime_ns"]:
+        return False
+    return file_sha256(path) != record["sha256"]
+
+
+def manifest_path(processed_dir=DEFAULT_PROCESSED_DIR) -> Path:
+    return Path(processed_dir) / MANIFEST_NAME
+
+
+def load_manifest(processed_dir=DEFAULT_PROCESSED_DIR) -> Optional[Dict]:
+    """The manifest, or None if it is missing, unreadable or from another format version."""
+    try:
+        with open(manifest_path(processed_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(manifest: Dict, processed_dir=DEFAULT_PROCESSED_DIR) -> Path:
+    """Write the manifest atomically."""
+    path = manifest_path(processed_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({**manifest, "version": MANIFEST_VERSION}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def stale_files(processed_dir=DEFAULT_PROCESSED_DIR) -> List[str]:
+    """Paths of the runtime's files that changed since prepare_corpus.py ran.
+    Empty when there is no manifest: nothing can be said about hand-made files.
+    """
+    manifest = load_manifest(processed_dir)
+    if manifest is None:
+        return []
+    return [record["path"] for record in manifest.get("runtime", []) if file_changed(record)]
@@ -0,0 +1,199 @@
+import json
+import re
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_ALBUM_JSON = Path(__file__).resolve().parent.parent / "data" / "raw" / "taylor_swift" / "album-song-lyrics.json"
+WORD_RE = re.compile(r'\b[a-zA-Z]+\b')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphabetic tokens, the unit every n-gram table is keyed on."""
+    return WORD_RE.findall(text.lower())
+
+
+def iter_json_array(path, chunk_size: int = 1 << 16) -> Iterator:
+    """Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in `chunk_size` pieces and each element is decoded with raw_decode() as soon
+    as it is complete, so only one element (an album) is held as Python objects at a time.
+    Elements must be objects or arrays: a bare number could be cut short at a chunk boundary.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        while not buffer:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # Leading whitespace may be longer than a chunk
+            buffer = chunk.lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            while not buffer and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = chunk.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]") or not buffer:
+                return
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The element continues past the buffer: grow it geometrically so a large element
+                # is re-scanned O(log size) times rather than once per chunk
+                chunk = f.read(max(chunk_size, len(buffer)))
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            yield element
+            buffer = buffer[end:]
+
+
+class CorpusStore:
+    """Albums, songs and lyric lines in compact columnar form, shared by the n-gram model and
+    the song-mode game so every line is loaded once.
+
+    Line i belongs to song `line_song[i]`; its part is `parts[line_part[i]]`, its position in the
+    song `line_order[i]`, and its text is the UTF-8 slice `text_offsets[i]:text_offsets[i + 1]`
+    of one shared buffer. Lines of a song are contiguous: song s owns lines
+    `song_lines[s]:song_lines[s + 1]`, so a song-relative index is `line_id - song_lines[s]`.
+    `line_words` holds each line's whitespace word count, counted while loading. Token spans
+    (`token_ids[token_offsets[i]:token_offsets[i + 1]]`, IDs into `words`) are built on first
+    use by tokenized(), since only a model rebuild or evaluation needs them.
+    """
+
+    def __init__(self, source_path: Optional[Path] = None):
+        # The file the store was read from, if any; the model artifact fingerprints it
+        self.source_path = Path(source_path) if source_path else None
+        self.albums: List[Tuple[str, str]] = []  # (code, title)
+        self.song_titles: List[str] = []
+        self.song_album = array("i")
+        self.song_track = array("i")
+        self.song_lines = array("I", [0])
+        # Distinct parts per song, in order of first appearance
+        self.song_parts: List[Tuple[str, ...]] = []
+        self.parts: List[str] = []
+        self._part_ids: Dict[str, int] = {}
+        self.line_song = array("I")
+        self.line_part = array("H")
+        self.line_order = array("i")
+        self.line_words = array("H")
+        self.text_offsets = array("I", [0])
+        self._text = bytearray()
+        # Case-folded title -> song ID; a later song with the same title wins
+        self.song_ids: Dict[str, int] = {}
+        self.words: List[str] = []
+        self._word_ids: Dict[str, int] = {}
+        self.token_ids = array("I")
+        self.token_offsets = array("I", [0])
+
+    @classmethod
+    def from_album_json(cls, path=DEFAULT_ALBUM_JSON) -> "CorpusStore":
+        """Stream album-song-lyrics.json into a store (empty if the file is missing)."""
+        store = cls(path)
+        if Path(path).exists():
+            for album in iter_json_array(path):
+                if isinstance(album, dict):
+                    store.add_album(album)
+        return store
+
+    def add_album(self, album: Dict, skip_existing: bool = False) -> List[int]:
+        """Append an album in the album-song-lyrics.json format. Returns the new song IDs.
+        With `skip_existing`, songs whose title is already known are left out.
+        """
+        songs = []
+        for song in album.get("Songs", []):
+            title = (song.get("Title") or "").strip()
+            if title and not (skip_existing and title.lower() in self.song_ids):
+                songs.append((title, song))
+        if not songs:
+            return []
+        album_id = len(self.albums)
+        self.albums.append((album.get("Code", ""), album.get("Title", "")))
+        return [self._add_song(album_id, title, song) for title, song in songs]
+
+    def _add_song(self, album_id: int, title: str, song: Dict) -> int:
+        song_id = len(self.song_titles)
+        parts: List[str] = []
+        text_buffer = self._text
+        # Bound once: this loop runs for every line of the corpus
+        add_song, add_part, add_order = self.line_song.append, self.line_part.append, self.line_order.append
+        add_words, add_offset = self.line_words.append, self.text_offsets.append
+        for line in song.get("Lyrics", []):
+            text = line.get("Text")
+            if not isinstance(text, str):
+                text = ""
+            part = (line.get("SongPart") or "").strip()
+            if part and part not in parts:
+                parts.append(part)
+            try:
+                order = int(line.get("Order", 0))
+            except (TypeError, ValueError):
+                order = 0
+            add_song(song_id)
+            add_part(self._part_id(part))
+            add_order(order)
+            add_words(min(len(text.split()), 0xFFFF))
+            text_buffer += text.encode("utf-8")
+            add_offset(len(text_buffer))
+        self.song_titles.append(title)
+        self.song_album.append(album_id)
+        self.song_track.append(int(song.get("TrackNumber") or 0))
+        self.song_parts.append(tuple(parts))
+        self.song_lines.append(len(self.line_song))
+        self.song_ids[title.lower()] = song_id
+        return song_id
+
+    def _part_id(self, part: str) -> int:
+        part_id = self._part_ids.get(part)
+        if part_id is None:
+            part_id = self._part_ids[part] = len(self.parts)
+            self.parts.append(part)
+        return part_id
+
+    # ---- lookups ----
+    def __len__(self) -> int:
+        return len(self.line_song)
+
+    def find_song(self, title: str) -> Optional[int]:
+        return self.song_ids.get(title.strip().lower())
+
+    def song_album_title(self, song_id: int) -> str:
+        return self.albums[self.song_album[song_id]][1]
+
+    def line_text(self, line_id: int) -> str:
+        return self._text[self.text_offsets[line_id]:self.text_offsets[line_id + 1]].decode("utf-8")
+
+    def texts(self) -> Iterator[str]:
+        """Every line's text, in storage order."""
+        for line_id in range(len(self)):
+            yield self.line_text(line_id)
+
+    def tokenized(self) -> "CorpusStore":
+        """Fill in the token spans of lines added since the last call; returns the store."""
+        add_token = self.token_ids.append
+        for line_id in range(len(self.token_offsets) - 1, len(self)):
+            for word in tokenize(self.line_text(line_id)):
+                word_id = self._word_ids.get(word)
+                if word_id is None:
+                    word_id = self._word_ids[word] = len(self.words)
+                    self.words.append(word)
+                add_token(word_id)
+            self.token_offsets.append(len(self.token_ids))
+        return self
+
+    def line_tokens(self, line_id: int) -> List[str]:
+        """tokenize() of the line, from its token span (call tokenized() first)."""
+        words = self.words
+        return [words[i] for i in self.token_ids[self.token_offsets[line_id]:self.token_offsets[line_id + 1]]]
+
+    def nbytes(self) -> int:
+        columns = (self.song_album, self.song_track, self.song_lines, self.line_song, self.line_part,
+                   self.line_order, self.line_words, self.text_offsets, self.token_ids, self.token_offsets)
+        return len(self._text) + sum(c.itemsize * len(c) for c in columns)
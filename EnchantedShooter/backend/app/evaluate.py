@@ -0,0 +1,197 @@
+"""Held-out perplexity evaluation for choosing model order and smoothing.
+
+Splits album-song-lyrics.json into train / held-out sets by album or by song, trains an
+NGramModel on the training lines, and scores every held-out token in one vectorised NumPy pass.
+
+Usage (from backend/app):
+    python evaluate.py --split album --holdout 0.2 --add-k 1 0.1 0.01 --lambdas 0.1,0.3,0.6
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_store import DEFAULT_ALBUM_JSON, CorpusStore
+from ngram_model import NGramModel, tokenize
+from ngram_store import CSRNGramTable
+
+DEFAULT_LYRICS_PATH = DEFAULT_ALBUM_JSON
+
+
+def load_songs(path: Path = DEFAULT_LYRICS_PATH) -> List[Dict]:
+    """Flatten the album JSON into [{"album", "title", "lines"}] records (a view over a CorpusStore)."""
+    store = CorpusStore.from_album_json(path)
+    songs = []
+    for song_id, title in enumerate(store.song_titles):
+        code, album_title = store.albums[store.song_album[song_id]]
+        first, last = store.song_lines[song_id], store.song_lines[song_id + 1]
+        songs.append({"album": code or album_title, "title": title, "lines": [store.line_text(i) for i in range(first, last)]})
+    return songs
+
+
+def split_songs(songs: List[Dict], by: str = "album", holdout: float = 0.2, seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """Deterministically hold out a fraction of albums (or songs)."""
+    rng = random.Random(seed)
+    if by == "album":
+        albums = sorted({s["album"] for s in songs})
+        held = set(rng.sample(albums, max(1, round(len(albums) * holdout))))
+        return [s for s in songs if s["album"] not in held], [s for s in songs if s["album"] in held]
+    if by == "song":
+        indices = list(range(len(songs)))
+        held = set(rng.sample(indices, max(1, round(len(songs) * holdout))))
+        return [s for i, s in enumerate(songs) if i not in held], [s for i, s in enumerate(songs) if i in held]
+    raise ValueError(f"Unknown split {by!r}, expected 'album' or 'song'")
+
+
+class HeldOutSet:
+    """Held-out lines as one flat token-ID array plus the positions that get scored.
+
+    Lines shorter than the model order are skipped, as they are in training. Out-of-vocabulary
+    tokens get ID -1 and are never found in any table.
+    """
+
+    def __init__(self, lines: Sequence[str], word_to_id: Dict[str, int], order: int):
+        token_lines = [tokenize(line) for line in lines]
+        token_lines = [t for t in token_lines if len(t) >= order]
+        lengths = np.array([len(t) for t in token_lines], dtype=np.int64)
+        self.ids = np.array([word_to_id.get(w, -1) for t in token_lines for w in t], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(lengths) else np.zeros(0, dtype=np.int64)
+        # Every token with a full (order-1)-word history inside its own line
+        self.positions = np.concatenate(
+            [np.arange(s + order - 1, s + n) for s, n in zip(starts.tolist(), lengths.tolist())]
+        ) if len(lengths) else np.zeros(0, dtype=np.int64)
+        self.num_lines = len(token_lines)
+
+    def window(self, n: int) -> np.ndarray:
+        """(positions, n) matrix of token IDs: the n-1 context words then the predicted word."""
+        return np.stack([self.ids[self.positions - (n - 1 - j)] for j in range(n)], axis=1)
+
+
+def gather_counts(table: CSRNGramTable, window: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorised count_and_total() for every row of `window`."""
+    vocab_size = len(table.words)
+    known = (window >= 0).all(axis=1)
+    safe = np.where(window >= 0, window, 0)
+    context_keys = np.zeros(len(window), dtype=np.int64)
+    for col in range(window.shape[1] - 1):
+        context_keys = context_keys * vocab_size + safe[:, col]
+
+    rows = np.minimum(np.searchsorted(table.context_keys, context_keys), max(len(table) - 1, 0))
+    context_found = (table.context_keys[rows] == context_keys) & (window[:, :-1] >= 0).all(axis=1)
+    totals = np.where(context_found, table.row_totals[rows], 0)
+
+    # (context key, next id) packed keys are globally sorted: rows are sorted and so are ids within a row
+    pair_keys = np.repeat(table.context_keys, np.diff(table.offsets)) * vocab_size + table.next_ids
+    wanted = context_keys * vocab_size + safe[:, -1]
+    slots = np.minimum(np.searchsorted(pair_keys, wanted), max(len(pair_keys) - 1, 0))
+    found = known & context_found & (pair_keys[slots] == wanted)
+    counts = np.where(found, table.counts[slots], 0)
+    return counts.astype(np.float64), totals.astype(np.float64)
+
+
+def batch_perplexity(model: NGramModel, held_out: HeldOutSet, n: int = 3, add_k: float = 1.0,
+                     lambdas: Optional[Sequence[float]] = None) -> float:
+    """Perplexity of every scored held-out token at once.
+
+    Without `lambdas` this is the add-k smoothed order-n model (add_k=1 matches
+    NGramModel.perplexity); with `lambdas` (one weight per order, lowest first) the orders are
+    linearly interpolated as in NGramModel.interpolated_prob.
+    """
+    if not len(held_out.positions):
+        return float("inf")
+    vocab_size = len(model.vocabulary)
+    tables = csr_tables(model)
+
+    def order_prob(k: int) -> np.ndarray:
+        counts, totals = gather_counts(tables[k], held_out.window(k))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (counts + add_k) / (totals + add_k * vocab_size)
+
+    if lambdas is None:
+        probs = order_prob(n)
+    else:
+        probs = sum(weight * order_prob(k) for k, weight in enumerate(lambdas, start=1) if weight)
+    with np.errstate(divide="ignore"):
+        return float(np.exp(-np.mean(np.log(probs))))
+
+
+def csr_tables(model: NGramModel) -> Dict[int, CSRNGramTable]:
+    """The model's tables in CSR form (converting dict-backend tables if needed)."""
+    if all(isinstance(t, CSRNGramTable) for t in model.ngram_counts.values()):
+        return model.ngram_counts
+    words = sorted(model.vocabulary)
+    word_to_id = {w: i for i, w in enumerate(words)}
+    return {
+        n: t if isinstance(t, CSRNGramTable) else CSRNGramTable.from_counts(t, words, words=words, word_to_id=word_to_id)
+        for n, t in model.ngram_counts.items()
+    }
+
+
+def evaluate(split: str = "album", holdout: float = 0.2, seed: int = 0, add_ks: Sequence[float] = (1.0,),
+             lambda_sets: Sequence[Sequence[float]] = ((0.1, 0.3, 0.6),), path: Path = DEFAULT_LYRICS_PATH) -> Dict:
+    """Train on one side of the split and report held-out perplexity for every setting."""
+    timings = {}
+    start = time.perf_counter()
+    train, held = split_songs(load_songs(path), by=split, holdout=holdout, seed=seed)
+    model = NGramModel(lines=[line for song in train for line in song["lines"]], backend="csr")
+    timings["train_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    word_to_id = model.ngrams.word_to_id
+    held_out = HeldOutSet([line for song in held for line in song["lines"]], word_to_id, model.order)
+    results = []
+    for n in range(1, model.order + 1):
+        for k in add_ks:
+            results.append({"order": n, "add_k": k, "perplexity": batch_perplexity(model, held_out, n=n, add_k=k)})
+    for lambdas in lambda_sets:
+        for k in add_ks:
+            results.append({"order": "interpolated", "lambdas": list(lambdas), "add_k": k,
+                            "perplexity": batch_perplexity(model, held_out, add_k=k, lambdas=lambdas)})
+    timings["evaluate_s"] = time.perf_counter() - start
+
+    return {
+        "split": split,
+        "holdout": holdout,
+        "seed": seed,
+        "train_songs": len(train),
+        "held_out_songs": len(held),
+        "held_out_tokens": int(len(held_out.positions)),
+        "oov_rate": float((held_out.ids < 0).mean()) if len(held_out.ids) else 0.0,
+        "results": results,
+        "timings": timings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Held-out perplexity for model order / smoothing selection")
+    parser.add_argument("--split", choices=["album", "song"], default="album")
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction of albums/songs held out")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--add-k", type=float, nargs="+", default=[1.0], help="additive smoothing constants to try")
+    parser.add_argument("--lambdas", nargs="*", default=["0.1,0.3,0.6"],
+                        help="interpolation weights (unigram,bigram,trigram) to try")
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    lambda_sets = [tuple(float(x) for x in item.split(",")) for item in args.lambdas]
+    report = evaluate(args.split, args.holdout, args.seed, args.add_k, lambda_sets)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n📊 {report['train_songs']} train / {report['held_out_songs']} held-out songs "
+          f"(split by {report['split']}), {report['held_out_tokens']} scored tokens, "
+          f"OOV {report['oov_rate']:.1%}")
+    for row in report["results"]:
+        label = f"order {row['order']}" if row["order"] != "interpolated" else f"interp {row['lambdas']}"
+        print(f"  {label:<28} add-k {row['add_k']:<6} perplexity {row['perplexity']:10.1f}")
+    print(f"⏱️  train {report['timings']['train_s']:.3f}s, evaluate {report['timings']['evaluate_s']:.3f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Where model-based question generation runs: "thread" (the calling worker thread), "process"
+# (a pool of processes with the model preloaded) or "inline" (no offloading at all)
+MODES = ("inline", "thread", "process")
+
+# endpoint -> (timeout seconds, max requests in flight); override with
+# EXECUTOR_TIMEOUT_<ENDPOINT> / EXECUTOR_MAX_PENDING_<ENDPOINT>
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    "question": (2.0, 64),
+    "questions": (5.0, 16),
+    "check_answer": (1.0, 256),
+    "session": (1.0, 256),
+    "songs": (2.0, 64),
+    "stats": (2.0, 16),
+    "default": (2.0, 128),
+}
+
+
+class Overloaded(Exception):
+    """Raised when an endpoint already has its maximum number of requests in flight."""
+
+
+class ExecutorConfig:
+    """Execution mode, pool sizes and per-endpoint timeouts / queue-depth limits."""
+
+    def __init__(self, mode: str = "thread", threads: Optional[int] = None, processes: Optional[int] = None,
+                 limits: Optional[Dict[str, Tuple[float, int]]] = None, start_method: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}, expected one of {MODES}")
+        self.mode = mode
+        self.threads = threads or min(32, (os.cpu_count() or 1) + 4)
+        self.processes = processes or os.cpu_count() or 1
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        methods = multiprocessing.get_all_start_methods()
+        self.start_method = start_method or ("forkserver" if "forkserver" in methods else "spawn")
+
+    @classmethod
+    def from_env(cls) -> "ExecutorConfig":
+        limits = {}
+        for endpoint, (timeout, max_pending) in DEFAULT_LIMITS.items():
+            suffix = endpoint.upper()
+            limits[endpoint] = (
+                float(os.environ.get(f"EXECUTOR_TIMEOUT_{suffix}", timeout)),
+                int(os.environ.get(f"EXECUTOR_MAX_PENDING_{suffix}", max_pending)),
+            )
+        return cls(
+            mode=os.environ.get("EXECUTOR_MODE", "thread").lower(),
+            threads=int(os.environ.get("EXECUTOR_THREADS", 0)) or None,
+            processes=int(os.environ.get("EXECUTOR_PROCESSES", 0)) or None,
+            limits=limits,
+            start_method=os.environ.get("EXECUTOR_START_METHOD") or None,
+        )
+
+    def limit(self, endpoint: str) -> Tuple[float, int]:
+        return self.limits.get(endpoint, self.limits.get("default", (2.0, 128)))
+
+
+# ---- Process pool worker side ----
+_worker_model = None
+
+
+def _init_process_worker() -> None:
+    """Load the model once per pool process (from the mmap'd artifact, so this is cheap)."""
+    global _worker_model
+    from ngram_model import NGramModel
+    _worker_model = NGramModel()
+
+
+def _generate_lyrics(count: int) -> List[Tuple]:
+    return _worker_model.generate_incomplete_lyrics(count)
+
+
+def _worker_pid() -> int:
+    # Runs only after _init_process_worker; the pause lets every idle process pick one up
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class Executors:
+    """Runs blocking game logic off the asyncio event loop.
+
+    `run()` executes a call on the thread pool under the endpoint's timeout, rejecting it with
+    Overloaded when the endpoint already has `max_pending` calls in flight. In "process" mode,
+    `lyrics_generator()` hands model sampling to a process pool so CPU-heavy generation doesn't
+    contend for the GIL with request handling. The thread pool starts lazily; the process pool
+    is started by warm(), which GameManager.load() runs before reporting ready (and run_server.py
+    in each forked worker). Pools are recreated after fork.
+    """
+
+    def __init__(self, config: Optional[ExecutorConfig] = None):
+        self.config = config or ExecutorConfig.from_env()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # Optional fn -> fn wrapper applied to every call, e.g. by profiling.py
+        self.call_wrapper: Optional[Callable[[Callable], Callable]] = None
+        self._init_runtime()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_runtime)
+
+    def _init_runtime(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def _count(self, endpoint: str, name: str) -> None:
+        with self._lock:
+            self._count_locked(endpoint, name)
+
+    def _count_locked(self, endpoint: str, name: str) -> None:
+        counters = self._counters.setdefault(endpoint, {"completed": 0, "rejected": 0, "timed_out": 0, "failed": 0})
+        counters[name] += 1
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            with self._lock:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(self.config.threads, thread_name_prefix="game")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            with self._lock:
+                if self._processes is None:
+                    context = multiprocessing.get_context(self.config.start_method)
+                    self._processes = ProcessPoolExecutor(self.config.processes, mp_context=context,
+                                                          initializer=_init_process_worker)
+        return self._processes
+
+    def warm(self, timeout: float = 120.0) -> int:
+        """Start the process pool and wait until every process has loaded its model, so no request
+        pays for (or times out on) process start-up. Returns the number of ready processes.
+        """
+        if self.config.mode != "process":
+            return 0
+        pool = self._process_pool()
+        ready = set()
+        deadline = time.monotonic() + timeout
+        while len(ready) < self.config.processes and time.monotonic() < deadline:
+            # One task per process; a process only takes tasks once its initializer has run
+            futures = [pool.submit(_worker_pid) for _ in range(self.config.processes)]
+            ready.update(f.result(timeout=max(deadline - time.monotonic(), 0.1)) for f in futures)
+        return len(ready)
+
+    async def run(self, endpoint: str, fn: Callable, *args):
+        """Await fn(*args) from a pool thread, bounded by the endpoint's timeout and queue depth."""
+        if self.call_wrapper is not None:
+            fn = self.call_wrapper(fn)
+        if self.config.mode == "inline":
+            return fn(*args)
+        timeout, max_pending = self.config.limit(endpoint)
+        with self._lock:
+            if self._in_flight.get(endpoint, 0) >= max_pending:
+                self._count_locked(endpoint, "rejected")
+                raise Overloaded(f"Too many {endpoint} requests in flight")
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._thread_pool(), fn, *args)
+        except Exception:
+            # Never submitted (e.g. the pool is shut down), so no done-callback will free the slot
+            with self._lock:
+                self._in_flight[endpoint] -= 1
+                self._count_locked(endpoint, "failed")
+            raise
+        # The slot is released when the call actually finishes, not when the caller gives up
+        future.add_done_callback(lambda _: self._release(endpoint))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._count(endpoint, "timed_out")
+            raise
+        except Exception:
+            self._count(endpoint, "failed")
+            raise
+        self._count(endpoint, "completed")
+        return result
+
+    def _release(self, endpoint: str) -> None:
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+
+    def lyrics_generator(self, local: Callable[[int], List[Tuple]]) -> Callable[[int], List[Tuple]]:
+        """A generate_incomplete_lyrics(count) replacement for this mode; blocks the calling thread."""
+        if self.config.mode != "process":
+            return local
+        timeout, _ = self.config.limit("questions")
+
+        def generate(count: int) -> List[Tuple]:
+            try:
+                future: Future = self._process_pool().submit(_generate_lyrics, count)
+                return future.result(timeout=timeout)
+            except BrokenProcessPool:
+                # A pool process died: start a fresh pool next time, answer this call locally
+                with self._lock:
+                    self._processes = None
+                return local(count)
+        return generate
+
+    def stats(self) -> Dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint in sorted(set(self._counters) | set(self._in_flight)):
+                timeout, max_pending = self.config.limit(endpoint)
+                counters = self._counters.get(endpoint, {"completed": 0, "rejected": 0, "timed_out": 0, "failed": 0})
+                endpoints[endpoint] = {"timeout": timeout, "max_pending": max_pending,
+                                       "in_flight": self._in_flight.get(endpoint, 0), **counters}
+        return {"mode": self.config.mode, "threads": self.config.threads,
+                "processes": self.config.processes if self.config.mode == "process" else 0, "endpoints": endpoints}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, processes = self._threads, self._processes
+            self._threads = self._processes = None
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
+
+
+executors = Executors()
@@ -1,47 +1,256 @@
 import random
+import threading
+import time
 import uuid
-import json
-from pathlib import Path
-from typing import Dict, Optional, Tuple, List
+import os
+from collections import deque
+from typing import Callable, Dict, Optional, Sequence, Tuple, List, TypeVar
+import corpus_manifest
+from corpus_store import CorpusStore
 from ngram_model import NGramModel
+from song_catalog import RenderedCatalog, SongSearchIndex
+from song_index import SongPartIndex
+from vocab_index import LengthBucketIndex
+from question_pool import QuestionPool, RANDOM_MODE
+from session_store import GameSession, SessionConflict, create_session_store
+from executors import executors
+from metrics import ANSWERS, OPERATION_SECONDS, QUESTIONS, STAGE_SECONDS, registry
 
-class GameSession:
-    def __init__(self, session_id: str):
-        self.session_id = session_id
-        self.current_question: Optional[Dict] = None
-        self.score = 100
-        self.questions_answered = 0
-        self.created_at = None
-        # ordered playback state
-        self.song_title: Optional[str] = None
-        self.song_part: Optional[str] = None
-        self.part_lines_ordered: List[Dict] = []
-        self.part_index: int = 0
+_GET_QUESTION = OPERATION_SECONDS.labels("get_question")
+_GET_QUESTIONS = OPERATION_SECONDS.labels("get_questions")
+_CHECK_ANSWER = OPERATION_SECONDS.labels("check_answer")
+_SESSION_LOAD = STAGE_SECONDS.labels("session_load")
+_SESSION_SAVE = STAGE_SECONDS.labels("session_save")
+_SONG_LINE_LOOKUP = STAGE_SECONDS.labels("song_line_lookup")
+_SONG_DISTRACTORS = STAGE_SECONDS.labels("song_distractors")
+_FROM_POOL = QUESTIONS.labels("pool")
+_GENERATED = QUESTIONS.labels("generated")
+_FROM_SONG = QUESTIONS.labels("song")
+_CORRECT = ANSWERS.labels("correct")
+_WRONG = ANSWERS.labels("wrong")
+
+T = TypeVar("T")
+# Read-modify-write attempts per request before a session conflict is reported
+SESSION_UPDATE_ATTEMPTS = 3
+# Locks that serialise requests for the same session within this process
+SESSION_LOCK_STRIPES = 256
+
+
+class CorpusDeltaRejected(Exception):
+    """A corpus delta can't be applied consistently in this deployment (see corpus_delta_blocker)."""
 
 class GameManager:
+    """Game sessions plus the model and song catalogue behind them.
+
+    Construction is cheap: the model, lyrics and indexes are loaded by load(), which the API
+    runs in a background thread at startup (see start_loading()). Until `ready` is set, only
+    session bookkeeping works; readiness() reports the loading phase.
+    """
+
     def __init__(self):
-        self.ngram_model = NGramModel()
-        self.sessions: Dict[str, GameSession] = {}
-        # Load structured lyrics for song/part selection
-        self.song_data = self._load_raw_lyrics()
-        self.songs_index_by_title = self._index_songs_by_title(self.song_data)
-        self.song_parts_by_title = self._collect_song_parts(self.song_data)
+        self.sessions = create_session_store()
+        self.ngram_model: Optional[NGramModel] = None
+        self.ready = False
+        self.phase = "idle"
+        self.load_error: Optional[str] = None
+        # Seconds spent in each startup phase, exported as lyric_game_startup_seconds
+        self.startup_timings: Dict[str, float] = {}
+        # Prepared corpus files that no longer match their raw sources (see prepare_corpus.py)
+        self.stale_corpus: List[str] = []
+        self._load_lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+        # Bumped by every corpus delta; anything cached per catalogue can key on it
+        self.catalog_version = 0
+        self._update_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._session_locks = tuple(threading.Lock() for _ in range(SESSION_LOCK_STRIPES))
+        # /songs body for the current catalog_version, rendered on first request
+        self._rendered_songs: Optional[RenderedCatalog] = None
+        # /songs/search index for the current catalog_version, built on first search
+        self._song_search: Optional[SongSearchIndex] = None
+
+    def load(self, warm_executors: bool = True) -> None:
+        """Load the model, song catalogue and indexes. Safe to call repeatedly and from any thread.
+        `warm_executors` also starts the process pool (EXECUTOR_MODE=process) before reporting
+        ready; a pre-fork master passes False and each worker warms its own pool.
+        """
+        with self._load_lock:
+            if self.ready:
+                return
+            try:
+                self._load(warm_executors)
+            except Exception as e:
+                self.phase = "failed"
+                self.load_error = str(e)
+                raise
+
+    def _load(self, warm_executors: bool = True) -> None:
+        start = time.perf_counter()
+        self.phase = "corpus"
+        self.stale_corpus = corpus_manifest.stale_files()
+        if self.stale_corpus:
+            print(f"⚠️  Prepared corpus is out of date ({', '.join(self.stale_corpus)}); run prepare_corpus.py")
+        # Every lyric line, streamed once into compact columns; song mode and the model share it
+        self.corpus = CorpusStore.from_album_json()
+        self.startup_timings["corpus"] = time.perf_counter() - start
+        phase = time.perf_counter()
+        self.phase = "model"
+        self.ngram_model = NGramModel(corpus=self.corpus)
+        # generate_incomplete_lyrics(count), possibly running in a process pool (see executors.py)
+        self.generate_lyrics = executors.lyrics_generator(self.ngram_model.generate_incomplete_lyrics)
+        self.startup_timings["model"] = time.perf_counter() - phase
+        phase = time.perf_counter()
+        self.phase = "indexes"
+        self.vocab_index = LengthBucketIndex(self.ngram_model.vocabulary)
+        # Ordered, pre-split lines per (song, part); sessions only keep a cursor into it
+        self.song_index = SongPartIndex(self.corpus)
+        self.startup_timings["indexes"] = time.perf_counter() - phase
+        # Ready-made questions per mode, refilled off the request path
+        self.question_pool = QuestionPool(self._generate_pooled_question)
+        if warm_executors and executors.config.mode == "process":
+            phase = time.perf_counter()
+            self.phase = "executors"
+            executors.warm()
+            self.startup_timings["executors"] = time.perf_counter() - phase
+        self.startup_timings["total"] = time.perf_counter() - start
+        registry.collector(self._metric_families)
+        self.phase = "ready"
+        self.ready = True
+
+    def start_loading(self) -> None:
+        """Run load() in a background thread unless it is already done or under way."""
+        if self.ready or self.phase == "failed":
+            return
+        with self._load_lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(target=self._load_in_background, name="game-loader", daemon=True)
+            self._loader.start()
+
+    def _load_in_background(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            print(f"❌ Could not load the game model: {e}")
+
+    def readiness(self) -> Dict:
+        """Whether questions can be served, the current loading phase and its timings."""
+        return {
+            "ready": self.ready,
+            "phase": self.phase,
+            "error": self.load_error,
+            "startup_seconds": dict(self.startup_timings),
+            "catalog_version": self.catalog_version,
+            "stale_corpus": list(self.stale_corpus),
+        }
+
+    def corpus_delta_blocker(self) -> Optional[str]:
+        """Why a corpus delta can't be applied consistently in this deployment, or None.
+
+        A delta only updates the process that receives it: pre-fork workers (run_server.py sets
+        SERVER_WORKERS) would diverge, and process-pool executors keep sampling the old model.
+        """
+        if int(os.environ.get("SERVER_WORKERS", 1)) > 1:
+            return "Corpus deltas are not supported with multiple workers; add them to the corpus files and restart"
+        if executors.config.mode == "process":
+            return "Corpus deltas are not supported with EXECUTOR_MODE=process; add them to the corpus files and restart"
+        return None
+
+    def apply_corpus_delta(self, albums: Optional[List[Dict]] = None, lines=None) -> Dict:
+        """Add new albums and/or lyric lines to the live model and song catalogue.
+
+        `albums` follow album-song-lyrics.json; songs whose title is already in the catalogue
+        are skipped. `lines` is a {key: line} dict like flat-song-lyrics.json, or a list of lines.
+        Work is proportional to the delta: only the touched n-gram contexts, vocabulary buckets
+        and song entries change, ready-made questions are dropped and `catalog_version` bumped.
+        Raises CorpusDeltaRejected where a delta would leave processes out of sync.
+        """
+        reason = self.corpus_delta_blocker()
+        if reason:
+            raise CorpusDeltaRejected(reason)
+        with self._update_lock:
+            start = time.perf_counter()
+            new_lines = list(lines.values() if isinstance(lines, dict) else lines or [])
+            for album in albums or []:
+                for song in album.get("Songs", []):
+                    if (song.get("Title") or "").strip().lower() not in self.corpus.song_ids:
+                        new_lines.extend(line.get("Text") for line in song.get("Lyrics", []))
+
+            # Count first: the model reads the lines it already knows from the shared store
+            model = self.ngram_model
+            counted = model.add_lines(new_lines)
+            song_ids = [s for album in albums or [] for s in self.corpus.add_album(album, skip_existing=True)]
+            songs_added = len(song_ids)
+            self.song_index.add_songs(song_ids)
+            words_added = self.vocab_index.add(counted["words"])
+            if songs_added or counted["lines"]:
+                self.question_pool.clear()
+                self.catalog_version += 1
+            if model.overlay_ratio() > float(os.environ.get("CORPUS_COMPACT_RATIO", 0.1)):
+                self._start_compaction()
+            return {
+                "songs_added": songs_added,
+                "lines_added": counted["lines"],
+                "words_added": words_added,
+                "catalog_version": self.catalog_version,
+                "elapsed_ms": (time.perf_counter() - start) * 1000,
+            }
+
+    def _start_compaction(self) -> None:
+        """Fold the CSR delta overlays back into plain tables in a background thread."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact, name="model-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self) -> None:
+        with self._update_lock:
+            start = time.perf_counter()
+            if self.ngram_model.compact():
+                print(f"✅ Compacted n-gram tables in {time.perf_counter() - start:.2f}s")
     
     def create_session(self) -> str:
         """Create a new game session and return the session ID."""
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = GameSession(session_id)
+        self.sessions.add(GameSession(session_id))
         return session_id
     
+    def _update_session(self, session_id: str, update: Callable[[GameSession], Optional[T]]) -> Optional[T]:
+        """Load the session, apply `update` and save it, as one read-modify-write.
+
+        Returns update()'s result, or None if the session doesn't exist. Nothing is saved when
+        update() returns None. If the store reports that the session was saved concurrently
+        (SessionConflict, see SQLiteSessionStore.save), update() runs again on a fresh copy.
+        Within this process, updates of one session are serialised by a striped lock: in-memory
+        sessions are shared objects, so an unlocked update could lose writes or pop a batch
+        question another thread already took.
+        """
+        with self._session_locks[hash(session_id) % SESSION_LOCK_STRIPES]:
+            for attempt in range(SESSION_UPDATE_ATTEMPTS):
+                with _SESSION_LOAD.time():
+                    session = self.sessions.get(session_id)
+                if session is None:
+                    return None
+                result = update(session)
+                if result is None:
+                    return None
+                try:
+                    with _SESSION_SAVE.time():
+                        self.sessions.save(session)
+                    return result
+                except SessionConflict:
+                    if attempt == SESSION_UPDATE_ATTEMPTS - 1:
+                        raise
+        return None
+
+    @_GET_QUESTION.timed
     def get_question(self, session_id: str, song: Optional[str] = None, part: Optional[str] = None) -> Optional[Dict]:
         """Get a new question for the given session.
         If song and part are provided, attempt to generate a question from that specific song section.
         """
-        if session_id not in self.sessions:
-            return None
-        
-        session = self.sessions[session_id]
+        return self._update_session(session_id, lambda session: self._next_question(session, song, part))
 
+    def _next_question(self, session: GameSession, song: Optional[str], part: Optional[str]) -> Optional[Dict]:
         # Try song/part filtered question if provided
         filtered_question: Optional[Dict] = None
         if song and part:
@@ -50,30 +259,62 @@ class GameManager:
 
         if not filtered_question:
             # Fallback to model-generated question
-            incomplete_line, correct_word, distractors = self.ngram_model.generate_incomplete_lyric()
-            if not incomplete_line or not correct_word or not distractors:
-                return None
-            options = [correct_word] + distractors
-            random.shuffle(options)
-            question = {
-                "incomplete_lyric": incomplete_line,
-                "correct_answer": correct_word,
-                "options": options,
-                "question_id": f"q_{random.randint(10000, 99999)}"
-            }
+            question = self.question_pool.take((RANDOM_MODE,))
+            if question:
+                _FROM_POOL.inc()
+            else:
+                question = self._build_random_question()
+                if not question:
+                    return None
+                _GENERATED.inc()
         else:
             question = filtered_question
 
         session.current_question = question
+        session.pending_questions = None
         return session.current_question
+
+    @_GET_QUESTIONS.timed
+    def get_questions(self, session_id: str, count: int, song: Optional[str] = None, part: Optional[str] = None) -> Optional[List[Dict]]:
+        """Get `count` questions at once. The first becomes the current question and the
+        rest are queued, so check_answer() validates them in the order returned.
+        """
+        return self._update_session(session_id, lambda session: self._next_questions(session, count, song, part))
+
+    def _next_questions(self, session: GameSession, count: int, song: Optional[str], part: Optional[str]) -> Optional[List[Dict]]:
+        questions: List[Dict] = []
+        if song and part:
+            questions = self._generate_ordered_questions(session, song, part, count)
+
+        if not questions:
+            questions = self.question_pool.take_many((RANDOM_MODE,), count)
+            _FROM_POOL.inc(len(questions))
+            missing = count - len(questions)
+            if missing > 0:
+                for incomplete_line, correct_word, distractors in self.generate_lyrics(missing):
+                    question = self._make_question(incomplete_line, correct_word, distractors)
+                    if question:
+                        questions.append(question)
+                        _GENERATED.inc()
+            if not questions:
+                return None
+
+        session.current_question = questions[0]
+        session.pending_questions = deque(questions[1:]) if len(questions) > 1 else None
+        return questions
     
+    @_CHECK_ANSWER.timed
     def check_answer(self, session_id: str, selected_answer: str) -> Dict:
         """Check if the selected answer is correct for the current session question."""
-        if session_id not in self.sessions:
+        result = self._update_session(session_id, lambda session: self._apply_answer(session, selected_answer))
+        if result is None:
             return {"error": "Invalid session"}
-        
-        session = self.sessions[session_id]
-        
+        if "correct" in result:
+            # Counted once the answer is saved, not per attempt
+            (_CORRECT if result["correct"] else _WRONG).inc()
+        return result
+
+    def _apply_answer(self, session: GameSession, selected_answer: str) -> Dict:
         if not session.current_question:
             return {"error": "No current question"}
         
@@ -85,23 +326,24 @@ class GameManager:
             # subtract 10 points per wrong answer, floor at 0
             session.score = max(0, session.score - 10)
         
-        current_question = session.current_question.copy()
-        session.current_question = None
+        # Move on to the next question of a batch, if any
+        session.current_question = session.pending_questions.popleft() if session.pending_questions else None
         
         return {
             "correct": is_correct,
             "correct_answer": correct_answer,
             "feedback": "Correct! 🎵" if is_correct else f"Wrong! The correct answer was '{correct_answer}'",
             "score": session.score,
-            "questions_answered": session.questions_answered
+            "questions_answered": session.questions_answered,
+            "questions_remaining": len(session.pending_questions or ()) + (1 if session.current_question else 0)
         }
     
     def get_session_stats(self, session_id: str) -> Optional[Dict]:
         """Get statistics for a specific session."""
-        if session_id not in self.sessions:
+        session = self.sessions.get(session_id)
+        if session is None:
             return None
         
-        session = self.sessions[session_id]
         return {
             "score": session.score,
             "questions_answered": session.questions_answered,
@@ -109,82 +351,116 @@ class GameManager:
         }
     
     def cleanup_session(self, session_id: str) -> bool:
-        """Remove a session from memory."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            return True
-        return False
+        """Remove a session from the store."""
+        return self.sessions.delete(session_id)
     
     def get_model_stats(self) -> Dict:
         """Get statistics about the underlying model."""
         return self.ngram_model.get_vocabulary_stats()
 
-    # ---- New helpers for song/part functionality ----
-    def _load_raw_lyrics(self) -> List[Dict]:
-        """Load raw JSON lyrics for Taylor Swift albums/songs.
-        Returns a list of album dicts with nested songs and lyrics.
-        """
-        try:
-            current_file = Path(__file__).resolve()
-            backend_dir = current_file.parent.parent
-            raw_path = backend_dir / "data" / "raw" / "taylor_swift" / "album-song-lyrics.json"
-            if not raw_path.exists():
-                return []
-            with open(raw_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if isinstance(data, list):
-                return data
-            return []
-        except Exception:
-            return []
+    def get_session_store_stats(self) -> Dict:
+        """Get live session count, limits and eviction counters."""
+        return self.sessions.stats()
 
-    def _index_songs_by_title(self, albums: List[Dict]) -> Dict[str, Dict]:
-        index: Dict[str, Dict] = {}
-        for album in albums:
-            album_title = album.get("Title", "")
-            for song in album.get("Songs", []):
-                title = song.get("Title", "").strip()
-                if not title:
-                    continue
-                key = title.lower()
-                index[key] = {
-                    "title": title,
-                    "album": album_title,
-                    "lyrics": song.get("Lyrics", [])
-                }
-        return index
+    def get_song_index_stats(self) -> Dict:
+        """Get the size of the song/part line index."""
+        return self.song_index.stats()
+
+    def get_pool_stats(self) -> Dict:
+        """Get prefetch pool configuration and hit/miss counters per mode."""
+        return self.question_pool.stats()
 
-    def _collect_song_parts(self, albums: List[Dict]) -> Dict[str, List[str]]:
-        parts_by_title: Dict[str, List[str]] = {}
-        for album in albums:
-            for song in album.get("Songs", []):
-                title = song.get("Title", "").strip()
-                if not title:
-                    continue
-                parts = []
-                for line in song.get("Lyrics", []):
-                    p = (line.get("SongPart") or "").strip()
-                    if p and p not in parts:
-                        parts.append(p)
-                parts_by_title[title] = parts
-        return parts_by_title
+    def _metric_families(self):
+        """Scrape-time gauges for /metrics: sessions, model size, pools and startup phases."""
+        model = self.ngram_model
+        tables = model.ngram_counts
+        yield ("lyric_game_sessions", "gauge", "Live game sessions", [({}, len(self.sessions))])
+        yield ("lyric_game_model_vocabulary_size", "gauge", "Words in the model vocabulary",
+               [({"backend": model.backend}, len(model.vocabulary))])
+        yield ("lyric_game_model_contexts", "gauge", "Distinct contexts per n-gram order",
+               [({"order": str(n)}, len(table)) for n, table in sorted(tables.items())])
+        if all(hasattr(table, "nbytes") for table in tables.values()):
+            yield ("lyric_game_model_bytes", "gauge", "Bytes held by the n-gram table arrays",
+                   [({}, sum(table.nbytes() for table in tables.values()))])
+        pools = self.question_pool.stats()["modes"]
+        yield ("lyric_game_question_pool_ready", "gauge", "Ready questions in the prefetch pool",
+               [({"mode": mode}, stats["ready"]) for mode, stats in pools.items()])
+        for name in ("hits", "misses"):
+            yield (f"lyric_game_question_pool_{name}_total", "counter", f"Prefetch pool {name}",
+                   [({"mode": mode}, stats[name]) for mode, stats in pools.items()])
+        yield ("lyric_game_startup_seconds", "gauge", "Time spent in each startup phase",
+               [({"phase": phase}, seconds) for phase, seconds in self.startup_timings.items()])
 
+    def _build_random_question(self) -> Optional[Dict]:
+        """Generate a model-based question (no session state involved)."""
+        lyrics = self.generate_lyrics(1)
+        return self._make_question(*lyrics[0]) if lyrics else None
+
+    def _make_question(self, incomplete_line: Optional[str], correct_word: Optional[str], distractors: List[str]) -> Optional[Dict]:
+        if not incomplete_line or not correct_word or not distractors:
+            return None
+        options = [correct_word] + distractors
+        random.shuffle(options)
+        return {
+            "incomplete_lyric": incomplete_line,
+            "correct_answer": correct_word,
+            "options": options,
+            "question_id": f"q_{random.randint(10000, 99999)}"
+        }
+
+    def _generate_pooled_question(self, key: Tuple) -> Optional[Dict]:
+        """Pool generator: key is (RANDOM_MODE,) or (part, song title key, line index)."""
+        if key[0] == RANDOM_MODE:
+            return self._build_random_question()
+        part, title_key, index = key
+        song_id = self.corpus.find_song(title_key)
+        if song_id is None:
+            return None
+        line_ids = self.song_index.lines(song_id, part)
+        if index >= len(line_ids):
+            return None
+        return self._build_line_question(self.song_index.tokens(line_ids[index]))
+
+    # ---- New helpers for song/part functionality ----
     def list_songs(self) -> List[Dict]:
         """Return a list of songs with their album and available parts."""
         songs: List[Dict] = []
-        for key, meta in self.songs_index_by_title.items():
-            title = meta.get("title", "")
-            album = meta.get("album", "")
-            parts = self.song_parts_by_title.get(title, [])
+        for song_id in self.corpus.song_ids.values():
             songs.append({
-                "title": title,
-                "album": album,
-                "parts": parts
+                "title": self.corpus.song_titles[song_id],
+                "album": self.corpus.song_album_title(song_id),
+                "parts": list(self.corpus.song_parts[song_id])
             })
         # Sort for stable UI
         songs.sort(key=lambda s: (s.get("album", ""), s.get("title", "")))
         return songs
 
+    def cached_songs_response(self) -> Optional[RenderedCatalog]:
+        """The rendered /songs response if it is current, else None (see songs_response())."""
+        rendered = self._rendered_songs
+        return rendered if rendered is not None and rendered.version == self.catalog_version else None
+
+    def songs_response(self) -> RenderedCatalog:
+        """list_songs() serialized for the current catalogue version, rendering it if needed."""
+        rendered = self.cached_songs_response()
+        if rendered is None:
+            version = self.catalog_version
+            compress = os.environ.get("SONGS_GZIP", "1") != "0"
+            rendered = self._rendered_songs = RenderedCatalog(version, self.list_songs(), compress)
+        return rendered
+
+    def cached_song_search(self) -> Optional[SongSearchIndex]:
+        """The song search index if it is current, else None (see song_search())."""
+        index = self._song_search
+        return index if index is not None and index.version == self.catalog_version else None
+
+    def song_search(self) -> SongSearchIndex:
+        """Search index over list_songs() for the current catalogue version, building it if needed."""
+        index = self.cached_song_search()
+        if index is None:
+            index = self._song_search = SongSearchIndex(self.catalog_version, self.list_songs())
+        return index
+
     def _normalize_part(self, part: str) -> Optional[str]:
         if not part:
             return None
@@ -201,41 +477,55 @@ class GameManager:
         return mapping.get(p, part)
 
     def _generate_ordered_question(self, session: GameSession, song: str, part: str) -> Optional[Dict]:
+        questions = self._generate_ordered_questions(session, song, part, 1)
+        return questions[0] if questions else None
+
+    def _generate_ordered_questions(self, session: GameSession, song: str, part: str, count: int) -> List[Dict]:
+        """Next `count` questions in playback order; the song and part are resolved once."""
+        resolved = self._resolve_song_part(session, song, part)
+        if not resolved:
+            return []
+        title_key, part_key, line_ids = resolved
+
+        questions: List[Dict] = []
+        for _ in range(count):
+            # Select current line and advance index for next call
+            index = session.part_index % len(line_ids)
+            session.part_index = (index + 1) % len(line_ids)
+
+            question = (self.question_pool.take((part_key, title_key, index))
+                        or self._build_line_question(self.song_index.tokens(line_ids[index])))
+            if question:
+                questions.append(question)
+        _FROM_SONG.inc(len(questions))
+        # Have the following line ready by the time the player gets there
+        self.question_pool.prefetch((part_key, title_key, session.part_index))
+        return questions
+
+    @_SONG_LINE_LOOKUP.timed
+    def _resolve_song_part(self, session: GameSession, song: str, part: str) -> Optional[Tuple[str, str, Sequence[int]]]:
+        """Look up the song and part, (re)starting the session's cursor when they changed.
+        Returns (title key, part key, indexed line IDs), or None if there is nothing to play.
+        """
         title_key = song.strip().lower()
-        song_meta = self.songs_index_by_title.get(title_key)
-        if not song_meta:
+        song_id = self.corpus.find_song(title_key)
+        if song_id is None:
             return None
         normalized_part = self._normalize_part(part)
         if not normalized_part:
             return None
-        # Initialize or refresh sequence if song/part changed or empty
-        if (
-            session.song_title != title_key
-            or (session.song_part or "") .lower() != normalized_part.lower()
-            or not session.part_lines_ordered
-        ):
-            # Build ordered lines (by 'Order') with sufficient word count
-            lines = [l for l in song_meta.get("lyrics", []) if (l.get("SongPart") or "").strip().lower() == normalized_part.lower()]
-            try:
-                lines.sort(key=lambda l: int(l.get("Order", 0)))
-            except Exception:
-                pass
-            session.part_lines_ordered = [l for l in lines if isinstance(l.get("Text"), str) and len((l.get("Text") or "").split()) >= 3]
+        line_ids = self.song_index.lines(song_id, normalized_part)
+        if not line_ids:
+            return None
+        # Restart the cursor if song/part changed
+        if session.song_title != title_key or (session.song_part or "").lower() != normalized_part.lower():
             session.part_index = 0
             session.song_title = title_key
             session.song_part = normalized_part
+        return title_key, normalized_part.lower(), line_ids
 
-        if not session.part_lines_ordered:
-            return None
-
-        # Select current line and advance index for next call
-        line = session.part_lines_ordered[session.part_index % len(session.part_lines_ordered)]
-        session.part_index = (session.part_index + 1) % len(session.part_lines_ordered)
-
-        text = (line.get("Text") or "").strip()
-        if not text:
-            return None
-        incomplete_line, correct_word = self._make_incomplete_line(text)
+    def _build_line_question(self, words: Sequence[str]) -> Optional[Dict]:
+        incomplete_line, correct_word = self._make_incomplete_line(words)
         if not incomplete_line or not correct_word:
             return None
         distractors = self._pick_distractors(correct_word, num=4)
@@ -248,36 +538,20 @@ class GameManager:
             "question_id": f"q_{random.randint(10000, 99999)}"
         }
 
-    def _make_incomplete_line(self, text: str) -> Tuple[Optional[str], Optional[str]]:
-        words = text.split()
+    def _make_incomplete_line(self, words: Sequence[str]) -> Tuple[Optional[str], Optional[str]]:
         if len(words) < 3:
             return None, None
         # avoid first/last word for better gameplay
         remove_pos = random.randint(1, len(words) - 2)
         correct_word = words[remove_pos]
-        words_with_blank = words[:remove_pos] + ["___"] + words[remove_pos+1:]
+        words_with_blank = [*words[:remove_pos], "___", *words[remove_pos+1:]]
         return " ".join(words_with_blank), correct_word
 
+    @_SONG_DISTRACTORS.timed
     def _pick_distractors(self, correct_word: str, num: int = 4) -> List[str]:
-        # Choose distractors from vocabulary different from the correct word
-        vocab = list(self.ngram_model.vocabulary)
-        # Prefer similar length words
-        target_len = len(correct_word)
-        candidates = [w for w in vocab if w.lower() != correct_word.lower() and abs(len(w) - target_len) <= 2]
-        random.shuffle(candidates)
-        distractors: List[str] = []
-        for w in candidates:
-            if w.lower() != correct_word.lower():
-                distractors.append(w)
-            if len(distractors) >= num:
-                break
-        if len(distractors) < num:
-            random.shuffle(vocab)
-            for w in vocab:
-                if w.lower() != correct_word.lower() and w not in distractors:
-                    distractors.append(w)
-                if len(distractors) >= num:
-                    break
-        return distractors[:num]
+        # Choose distractors from vocabulary different from the correct word,
+        # preferring similar length words (see LengthBucketIndex)
+        return self.vocab_index.sample(len(correct_word), num, exclude={correct_word.casefold()})
 
+# Cheap to construct; the API loads it in the background at startup
 game_manager = GameManager()
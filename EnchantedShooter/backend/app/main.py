@@ -1,4 +1,3 @@
-from fastapi import FastAPI
 from lyric_game import LyricGuesserGame
 import sys
 
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ngram_store import CSRNGramTable
+
+ARTIFACT_MAGIC = b"ESNGRAM\x00"
+ARTIFACT_VERSION = 5
+ARTIFACT_NAME = "ngram_model.bin"
+_PREAMBLE = struct.Struct("<8sII")  # magic, format version, header length
+_ALIGN = 64
+
+
+def default_artifact_path(corpus_path) -> Path:
+    """Artifact lives next to the processed corpus it was built from."""
+    return Path(corpus_path).parent / ARTIFACT_NAME
+
+
+def source_fingerprint(sources: Iterable) -> str:
+    """Hash every input the model was built from (NGramModel.source_files()), so edits invalidate the artifact."""
+    digest = hashlib.sha256()
+    for source in map(Path, sources):
+        digest.update(source.name.encode("utf-8"))
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelArtifact:
+    """Read-only view of a compiled model file; arrays point straight into the mmap."""
+
+    def __init__(self, path: Path, mapping: mmap.mmap, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self._mapping = mapping
+        self.header = header
+        self.arrays = arrays
+        self.order: int = header["order"]
+        self.orders: List[int] = header.get("orders", [self.order])
+        self.words: List[str] = _decode_words(arrays["word_blob"], arrays["word_offsets"])
+
+    def table_arrays(self, n: int) -> Dict[str, np.ndarray]:
+        """Arrays of the order-n table, with their `o<n>_` prefix stripped."""
+        prefix = f"o{n}_"
+        return {name[len(prefix):]: arr for name, arr in self.arrays.items() if name.startswith(prefix)}
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _encode_words(words: List[str]):
+    encoded = [w.encode("utf-8") for w in words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def _decode_words(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def model_to_arrays(model) -> Dict[str, np.ndarray]:
+    """Flatten the vocabulary and every order's n-gram table into sorted, ID-based arrays."""
+    words = sorted(model.vocabulary)
+    word_to_id = {w: i for i, w in enumerate(words)}
+    word_blob, word_offsets = _encode_words(words)
+    arrays = {"word_blob": word_blob, "word_offsets": word_offsets}
+    for n, table in sorted(model.ngram_counts.items()):
+        if not isinstance(table, CSRNGramTable):
+            table = CSRNGramTable.from_counts(table, words, words=words, word_to_id=word_to_id)
+        arrays.update({f"o{n}_{name}": arr for name, arr in table.to_arrays().items()})
+    return arrays
+
+
+def write_artifact(model, path, fingerprint: str) -> Path:
+    """Serialize a built model to `path` (written atomically via a temp file)."""
+    path = Path(path)
+    arrays = model_to_arrays(model)
+
+    # Header size depends on the offsets it contains, so lay out twice until it settles
+    header = {"order": model.order, "orders": sorted(model.ngram_counts), "fingerprint": fingerprint, "arrays": {}}
+    header_bytes = b""
+    for _ in range(3):
+        offset = _align(_PREAMBLE.size + len(header_bytes))
+        for name, arr in arrays.items():
+            header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset = _align(offset + arr.nbytes)
+        new_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+        if new_bytes == header_bytes:
+            break
+        header_bytes = new_bytes
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.seek(header["arrays"][name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(_align(f.tell()))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_artifact(path, fingerprint: Optional[str] = None) -> Optional[ModelArtifact]:
+    """Memory-map a compiled model. Returns None if it is missing, corrupt, or stale."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _PREAMBLE.unpack_from(mapping, 0)
+        if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+            mapping.close()
+            return None
+        header = json.loads(mapping[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        if fingerprint is not None and header.get("fingerprint") != fingerprint:
+            mapping.close()
+            return None
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            arrays[name] = np.frombuffer(mapping, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+        return ModelArtifact(path, mapping, header, arrays)
+    except Exception as e:
+        print(f"Warning: Could not load model artifact {path}: {e}")
+        return None
+
+
+def build(corpus_path=None, artifact_path=None, force: bool = True):
+    """Build the model from the raw corpus and write its artifact.
+    Returns the model and the written path; with force=False an artifact that still matches
+    the corpus is kept and the path is None.
+    """
+    from ngram_model import NGramModel
+
+    model = NGramModel(corpus_path, artifact_path, use_artifact=not force)
+    if model.from_artifact:
+        return model, None
+    out = write_artifact(model, model.artifact_path, source_fingerprint(model.source_files()))
+    print(f"💾 Model artifact saved at: {out} ({out.stat().st_size / 1024:.0f} KiB)")
+    return model, out
+
+
+if __name__ == "__main__":
+    build()
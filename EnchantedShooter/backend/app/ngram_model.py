@@ -1,48 +1,208 @@
+import csv
 import pickle
 import random
-import re
-from collections import defaultdict, Counter
+from collections import Counter, defaultdict
 from pathlib import Path
-import pandas as pd
-import numpy as np
 import math
+import os
+import model_artifact
+from corpus_store import DEFAULT_ALBUM_JSON, CorpusStore, tokenize
+from metrics import STAGE_SECONDS
+from ngram_store import DictNGramTable, CSRNGramTable, OverlayNGramTable
+
+BACKENDS = ("dict", "csr")
+
+_CONTEXT_PICK = STAGE_SECONDS.labels("context_pick")
+_LINE_SAMPLING = STAGE_SECONDS.labels("line_sampling")
+_DISTRACTORS = STAGE_SECONDS.labels("distractors")
+
+def _is_corpus_line(value):
+    """load_corpus() keeps string values longer than 20 characters that contain a space."""
+    return isinstance(value, str) and len(value) > 20 and ' ' in value
+
+def _line_tokens(lyrics, n, words=None):
+    """Tokens of a lyric line, or None if the model skips it (too short or long, or has digits).
+    `words` are the line's tokens when they are already known.
+    """
+    if not isinstance(lyrics, str) or lyrics == 'nan' or lyrics == 'None':
+        return None
+    if words is None:
+        words = tokenize(lyrics)
+    if len(words) < n or len(words) > 500 or any(word.isdigit() for word in words):
+        return None
+    return words
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+def _read_tsv_columns(path, encodings):
+    """Read a TSV into {column: non-empty values}, trying each encoding in turn."""
+    for encoding in encodings:
+        try:
+            with open(path, newline='', encoding=encoding) as f:
+                rows = list(csv.reader(f, delimiter='\t'))
+        except UnicodeDecodeError:
+            continue
+        except Exception:
+            return None
+        if not rows:
+            return None
+        header, body = rows[0], rows[1:]
+        return {
+            name: [row[i] for row in body if i < len(row) and row[i] != '']
+            for i, name in enumerate(header)
+        }
+    return None
+
+def _text_column(columns, min_length):
+    """The first non-numeric column whose first value looks like a lyric line."""
+    for values in columns.values():
+        if not values or all(_is_number(v) for v in values):
+            continue
+        sample = values[0]
+        if len(sample) > min_length and not sample.isdigit() and ' ' in sample:
+            return values
+    return None
+
+def _frame_text_column(frame, min_length):
+    """_text_column() for a pickled DataFrame, without importing pandas ourselves."""
+    for col in frame.columns:
+        if frame[col].dtype == 'object':
+            values = frame[col].dropna()
+            sample = str(values.iloc[0]) if len(values) > 0 else ""
+            if len(sample) > min_length and not sample.isdigit() and ' ' in sample:
+                return values.astype(str).tolist()
+    return None
 
 class NGramModel:
-    def __init__(self, corpus_path=None):
-        """Initialize the N-Gram model with Taylor Swift corpus data."""
+    def __init__(self, corpus_path=None, artifact_path=None, use_artifact=True, backend=None, lines=None, corpus=None):
+        """Initialize the N-Gram model with Taylor Swift corpus data.
+
+        If a precompiled artifact (see model_artifact.py) matches the current corpus it is
+        memory-mapped instead of re-reading and re-counting the raw lyrics.
+        `backend` selects the n-gram storage: "dict" (tuple -> Counter) or "csr" (int32 ID
+        arrays, see ngram_store.py). Defaults to the NGRAM_BACKEND env var, else "dict", which is
+        faster per question; run_server.py's pre-fork mode sets "csr" so workers share the mmap.
+        `lines` builds the model from the given lyric lines instead of the corpus files
+        (used by evaluate.py for train/held-out splits), filtered and de-duplicated like the corpus.
+        The lyrics come from a CorpusStore: `corpus` if given (GameManager shares its own), else
+        one streamed from album-song-lyrics.json when it is needed. Passing `corpus_path`, or a
+        missing album JSON, reads the pickled flat corpus instead.
+        """
+        backend = (backend or os.environ.get("NGRAM_BACKEND") or "dict").lower()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown n-gram backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.corpus = corpus
+        self._use_store = corpus is not None or (corpus_path is None and DEFAULT_ALBUM_JSON.exists())
+        # Store line ID of each corpus_data entry, so building can reuse the store's token spans
+        self._corpus_line_ids = None
+        self.from_artifact = False
         if corpus_path is None:
             current_file = Path(__file__).resolve()
             
             backend_dir = current_file.parent.parent  
             corpus_path = backend_dir / "data" / "processed" / "corpus_json.pkl"
         
-        self.corpus_path = corpus_path
+        self.corpus_path = Path(corpus_path)
+        self.artifact_path = Path(artifact_path) if artifact_path else model_artifact.default_artifact_path(self.corpus_path)
         self.corpus_data = None
-        self.ngrams = defaultdict(Counter)
+        # Highest order; generation uses ngram_counts[order] (aliased as self.ngrams)
+        self.order = 3
+        self.ngram_counts = {n: DictNGramTable() for n in range(1, self.order + 1)}
+        self.ngrams = self.ngram_counts[self.order]
         self.vocabulary = set()
-        self.load_corpus()
-        self.build_ngrams()
+        self.vocab = self.vocabulary
+        # Snapshot behind get_vocabulary_stats(), refreshed whenever the tables change
+        self._stats = {}
+        self._refresh_stats()
+        # Every corpus line, so add_lines() doesn't count re-sent lines twice (see _index_known_lines)
+        self._known_lines = None
+        if lines is not None:
+            # Same filter and de-duplication as load_corpus(), so evaluation trains on what is served
+            self.corpus_data = list(dict.fromkeys(line for line in lines if _is_corpus_line(line)))
+            self.build_ngrams()
+        elif not (use_artifact and self.load_artifact()):
+            self.load_corpus()
+            self.build_ngrams()
+        self._index_known_lines()
+    
+    def load_artifact(self):
+        """Populate the model from a compiled artifact. Returns False if it is missing or stale."""
+        sources = self.source_files()
+        if sources is None:
+            return False
+        try:
+            fingerprint = model_artifact.source_fingerprint(sources)
+        except OSError:
+            return False
+        artifact = model_artifact.load_artifact(self.artifact_path, fingerprint)
+        if artifact is None:
+            return False
+        
+        words = artifact.words
+        self.vocabulary = set(words)
+        self.order = artifact.order
+        if self.backend == "csr":
+            # Zero-copy: the tables' arrays are views into the shared mmap
+            word_to_id = {w: i for i, w in enumerate(words)}
+            self.ngram_counts = {
+                n: CSRNGramTable.from_arrays(words, artifact.table_arrays(n), word_to_id=word_to_id)
+                for n in artifact.orders
+            }
+        else:
+            self.ngram_counts = {n: DictNGramTable.from_arrays(words, artifact.table_arrays(n)) for n in artifact.orders}
+        self._finalize()
+        self.from_artifact = True
+        print(f"✅ Loaded precompiled model: {len(self.vocabulary)} words, {len(self.ngrams)} n-grams")
+        return True
+    
+    def source_files(self):
+        """Every file load_corpus() reads, for the artifact fingerprint (None if not file-backed)."""
+        if self._use_store:
+            source = self.corpus.source_path if self.corpus is not None else DEFAULT_ALBUM_JSON
+            if source is None:
+                return None
+            sources = [source]
+        elif self.corpus_path.exists():
+            sources = [self.corpus_path]
+        else:
+            sources = sorted(self.corpus_path.parent.glob("*.pkl"))
+        metadata_dir = self.corpus_path.parent / "metadata"
+        if metadata_dir.exists():
+            sources.extend(sorted(metadata_dir.glob("*.tsv")))
+        return sources
     
     def load_corpus(self):
         """Load both corpus data and metadata files for comprehensive lyrics."""
         try:
             base_dir = Path(self.corpus_path).parent
-            all_lyrics = []
+            # Insertion-ordered set: lines are de-duplicated as they are read, not copied afterwards
+            all_lyrics = {}
             
-            if self.corpus_path.exists():
+            if self._use_store:
+                if self.corpus is None:
+                    self.corpus = CorpusStore.from_album_json()
+                # Same filter as the flat corpus; remember each line's ID for its token span
+                for line_id, text in enumerate(self.corpus.texts()):
+                    if _is_corpus_line(text) and text not in all_lyrics:
+                        all_lyrics[text] = line_id
+            
+            elif self.corpus_path.exists():
                 try:
                     with open(self.corpus_path, 'rb') as f:
                         corpus_data = pickle.load(f)
                     
                     # Handle different data types
-                    if isinstance(corpus_data, pd.DataFrame):
-                        for col in corpus_data.columns:
-                            if corpus_data[col].dtype == 'object':
-                                sample = str(corpus_data[col].dropna().iloc[0]) if len(corpus_data[col].dropna()) > 0 else ""
-                                if len(sample) > 20 and not sample.isdigit() and ' ' in sample:
-                                    lyrics_from_corpus = corpus_data[col].dropna().astype(str).tolist()
-                                    all_lyrics.extend(lyrics_from_corpus)
-                                    break
+                    if hasattr(corpus_data, 'columns'):
+                        # A pickled DataFrame (unpickling it is the only thing that imports pandas)
+                        lyrics_column = _frame_text_column(corpus_data, 20)
+                        if lyrics_column is not None:
+                            all_lyrics.update(dict.fromkeys(lyrics_column))
                     
                     elif isinstance(corpus_data, dict):
                         for key, value in corpus_data.items():
@@ -50,11 +210,11 @@ class NGramModel:
                                 if value and isinstance(value[0], str):
                                     sample = value[0] if len(value) > 0 else ""
                                     if len(sample) > 20 and not sample.isdigit() and ' ' in sample:
-                                        all_lyrics.extend(value)
+                                        all_lyrics.update(dict.fromkeys(value))
                                         continue
                             
-                            elif isinstance(value, str) and len(value) > 20 and ' ' in value:
-                                all_lyrics.append(value)
+                            elif _is_corpus_line(value):
+                                all_lyrics[value] = None
                             
                             elif hasattr(value, '__iter__') and not isinstance(value, str):
                                 try:
@@ -63,20 +223,20 @@ class NGramModel:
                                         if isinstance(item, str) and len(item) > 20 and ' ' in item:
                                             temp_lyrics.append(item)
                                     if temp_lyrics:
-                                        all_lyrics.extend(temp_lyrics)
+                                        all_lyrics.update(dict.fromkeys(temp_lyrics))
                                 except:
                                     continue
                     
                     elif isinstance(corpus_data, list):
                         for item in corpus_data:
                             if isinstance(item, str) and len(item) > 20 and ' ' in item:
-                                all_lyrics.append(item)
+                                all_lyrics[item] = None
                     
                     else:
                         try:
                             str_data = str(corpus_data)
                             if len(str_data) > 20 and ' ' in str_data:
-                                all_lyrics.append(str_data)
+                                all_lyrics[str_data] = None
                         except:
                             pass
                     
@@ -90,13 +250,9 @@ class NGramModel:
                             with open(pkl_file, 'rb') as f:
                                 df = pickle.load(f)
                             if hasattr(df, 'columns'):
-                                for col in df.columns:
-                                    if df[col].dtype == 'object':
-                                        sample = str(df[col].dropna().iloc[0]) if len(df[col].dropna()) > 0 else ""
-                                        if len(sample) > 20 and not sample.isdigit() and ' ' in sample:
-                                            lyrics_from_file = df[col].dropna().astype(str).tolist()
-                                            all_lyrics.extend(lyrics_from_file)
-                                            break
+                                lyrics_column = _frame_text_column(df, 20)
+                                if lyrics_column is not None:
+                                    all_lyrics.update(dict.fromkeys(lyrics_column))
                         except Exception as e:
                             continue
             
@@ -104,157 +260,228 @@ class NGramModel:
             if metadata_dir.exists():
                 lyrics_file = metadata_dir / "cots-lyric-details.tsv"
                 if lyrics_file.exists():
-                    try:
-                        for encoding in ['latin-1', 'cp1252', 'iso-8859-1', 'utf-8']:
-                            try:
-                                metadata_df = pd.read_csv(lyrics_file, sep='\t', encoding=encoding)
-                                
-                                lyrics_column = None
-                                for col in metadata_df.columns:
-                                    if 'lyric' in col.lower() or 'text' in col.lower() or 'word' in col.lower():
-                                        sample = str(metadata_df[col].dropna().iloc[0]) if len(metadata_df[col].dropna()) > 0 else ""
-                                        if len(sample) > 10 and not sample.isdigit():
-                                            lyrics_column = col
-                                            break
-                                
-                                if not lyrics_column:
-                                    for col in metadata_df.columns:
-                                        if metadata_df[col].dtype == 'object':
-                                            sample = str(metadata_df[col].dropna().iloc[0]) if len(metadata_df[col].dropna()) > 0 else ""
-                                            if len(sample) > 20 and not sample.isdigit() and ' ' in sample:
-                                                lyrics_column = col
-                                                break
-                                
-                                if lyrics_column:
-                                    metadata_lyrics = metadata_df[lyrics_column].dropna().astype(str).tolist()
-                                    all_lyrics.extend(metadata_lyrics)
-                                
-                                break
-                                
-                            except UnicodeDecodeError:
-                                continue
-                            except Exception as e:
-                                continue
-                    
-                    except Exception as e:
-                        pass
+                    columns = _read_tsv_columns(lyrics_file, ['latin-1', 'cp1252', 'iso-8859-1', 'utf-8'])
+                    if columns:
+                        lyrics_column = None
+                        for col, values in columns.items():
+                            if 'lyric' in col.lower() or 'text' in col.lower() or 'word' in col.lower():
+                                sample = values[0] if values else ""
+                                if len(sample) > 10 and not sample.isdigit():
+                                    lyrics_column = values
+                                    break
+                        
+                        if lyrics_column is None:
+                            lyrics_column = _text_column(columns, 20)
+                        
+                        if lyrics_column is not None:
+                            all_lyrics.update(dict.fromkeys(lyrics_column))
                 
                 for metadata_file in metadata_dir.glob("*.tsv"):
                     if metadata_file.name != "cots-lyric-details.tsv":
-                        try:
-                            for encoding in ['latin-1', 'cp1252']:
-                                try:
-                                    df = pd.read_csv(metadata_file, sep='\t', encoding=encoding)
-                                    for col in df.columns:
-                                        if df[col].dtype == 'object':
-                                            sample = str(df[col].dropna().iloc[0]) if len(df[col].dropna()) > 0 else ""
-                                            if len(sample) > 30 and not sample.isdigit() and ' ' in sample:
-                                                additional_lyrics = df[col].dropna().astype(str).tolist()
-                                                all_lyrics.extend(additional_lyrics)
-                                                break
-                                    break
-                                except:
-                                    continue
-                        except Exception as e:
-                            continue
+                        columns = _read_tsv_columns(metadata_file, ['latin-1', 'cp1252'])
+                        if columns:
+                            additional_lyrics = _text_column(columns, 30)
+                            if additional_lyrics is not None:
+                                all_lyrics.update(dict.fromkeys(additional_lyrics))
             
             if all_lyrics:
-                unique_lyrics = list(set(all_lyrics))
+                unique_lyrics = list(all_lyrics)
+                if self._use_store:
+                    self._corpus_line_ids = list(all_lyrics.values())
                 
-                self.corpus_data = pd.DataFrame({'lyrics': unique_lyrics})
+                self.corpus_data = unique_lyrics
                 print(f"✅ Loaded corpus with {len(unique_lyrics)} unique lyrics")
                 
             else:
                 print("❌ No lyrics data found from any source!")
-                self.corpus_data = pd.DataFrame()
+                self.corpus_data = []
                 
         except Exception as e:
             print(f"Error loading combined corpus: {e}")
-            self.corpus_data = pd.DataFrame()
+            self.corpus_data = []
     
     def build_ngrams(self, n=3):
-        """Build n-gram model from the combined lyrics data."""
-        if self.corpus_data.empty:
-            return
-        
-        if 'lyrics' in self.corpus_data.columns:
-            lyrics_data = self.corpus_data['lyrics'].dropna().tolist()
-        else:
-            print("❌ Expected 'lyrics' column not found in combined data!")
+        """Build every order from 1 to n in a single tokenization pass over the lyrics."""
+        self.order = n
+        self.ngram_counts = {k: DictNGramTable() for k in range(1, n + 1)}
+        self.ngrams = self.ngram_counts[n]
+        if not self.corpus_data:
             return
         
         valid_lyrics_count = 0
-        skipped_count = 0
+        line_ids = self._corpus_line_ids or ()
+        if line_ids:
+            self.corpus.tokenized()
         
-        for lyrics in lyrics_data:
-            if pd.isna(lyrics) or lyrics == 'nan' or lyrics == 'None':
-                continue
-            
-            words = re.findall(r'\b[a-zA-Z]+\b', lyrics.lower())
-            
-            if len(words) < n:
-                skipped_count += 1
-                continue
-            
-            if len(words) > 500:
-                skipped_count += 1
-                continue
-            
-            if any(word.isdigit() for word in words):
-                skipped_count += 1
+        for index, lyrics in enumerate(self.corpus_data):
+            line_id = line_ids[index] if index < len(line_ids) else None
+            words = _line_tokens(lyrics, n, self.corpus.line_tokens(line_id) if line_id is not None else None)
+            if words is None:
                 continue
                 
             self.vocabulary.update(words)
             
-            for i in range(len(words) - n + 1):
-                ngram = tuple(words[i:i+n])
-                if len(ngram) == n:
-                    self.ngrams[ngram[:-1]][ngram[-1]] += 1
+            for k, table in self.ngram_counts.items():
+                for i in range(len(words) - k + 1):
+                    table[tuple(words[i:i+k-1])][words[i+k-1]] += 1
             
             valid_lyrics_count += 1
         
+        if self.backend == "csr":
+            words = sorted(self.vocabulary)
+            word_to_id = {w: i for i, w in enumerate(words)}
+            self.ngram_counts = {
+                k: CSRNGramTable.from_counts(table, words, words=words, word_to_id=word_to_id)
+                for k, table in self.ngram_counts.items()
+            }
+        self._finalize()
+        
         print(f"✅ Built model: {len(self.vocabulary)} words, {len(self.ngrams)} n-grams")
         
         if valid_lyrics_count == 0:
             print("❌ Warning: No valid lyrics processed!")
     
+    def _finalize(self):
+        """Build the lookup structures used on the question path once counting is done."""
+        self.ngrams = self.ngram_counts[self.order]
+        self.vocab = self.vocabulary
+        for table in self.ngram_counts.values():
+            table.compile()
+        # Fixed array for O(1) random vocabulary draws; the CSR table already holds one
+        # Our own list (not a CSR table's ID -> word array), so add_lines() can append to it
+        self._vocab_list = list(getattr(self.ngrams, "words", None) or sorted(self.vocabulary))
+        self._refresh_stats()
+
+    def _refresh_stats(self):
+        """Recompute the stats snapshot. O(orders): every table keeps its running total."""
+        self._stats = {
+            'vocabulary_size': len(self.vocabulary),
+            'ngram_count': len(self.ngrams),
+            'total_ngrams': self.ngrams.total_count(),
+            'orders': {n: {'contexts': len(t), 'total': t.total_count()} for n, t in sorted(self.ngram_counts.items())},
+        }
+    
+    def _index_known_lines(self):
+        """Build the set of corpus lines at load time, from the lines just counted or the shared
+        CorpusStore, so the first add_lines() doesn't rescan the corpus on the request path.
+        Left unset only for an artifact-loaded model without a store, which falls back to
+        load_corpus() on its first delta.
+        """
+        if self.corpus_data is not None:
+            self._known_lines = set(self.corpus_data)
+        elif self.corpus is not None:
+            self._known_lines = {text for text in self.corpus.texts() if _is_corpus_line(text)}
+
+    def add_lines(self, lines):
+        """Count new lyric lines into every order without rebuilding the model.
+
+        Lines already in the corpus, or that load_corpus() would drop, are ignored, so the
+        result matches a rebuild over the combined corpus. Dict tables are updated directly; CSR tables get an overlay (see
+        ngram_store.OverlayNGramTable) until compact() is called. Returns the number of lines
+        counted and the words that are new to the vocabulary.
+        """
+        if self._known_lines is None:
+            if self.corpus_data is None:
+                self.load_corpus()
+            self._known_lines = set(self.corpus_data)
+        if self.corpus_data is None:
+            self.corpus_data = []
+        
+        deltas = {k: defaultdict(Counter) for k in self.ngram_counts}
+        new_words = set()
+        added = 0
+        for lyrics in lines:
+            if not _is_corpus_line(lyrics) or lyrics in self._known_lines:
+                continue
+            words = _line_tokens(lyrics, self.order)
+            if words is None:
+                continue
+            self._known_lines.add(lyrics)
+            self.corpus_data.append(lyrics)
+            new_words.update(w for w in words if w not in self.vocabulary)
+            for k, delta in deltas.items():
+                for i in range(len(words) - k + 1):
+                    delta[tuple(words[i:i+k-1])][words[i+k-1]] += 1
+            added += 1
+        if not added:
+            return {"lines": 0, "words": []}
+        
+        for k, delta in deltas.items():
+            self.ngram_counts[k] = self.ngram_counts[k].add_counts(delta)
+        self.ngrams = self.ngram_counts[self.order]
+        if new_words:
+            self.vocabulary.update(new_words)
+            # Appended in place: O(new words), and readers only index below the length they read
+            self._vocab_list.extend(sorted(new_words))
+        self._refresh_stats()
+        return {"lines": added, "words": sorted(new_words)}
+    
+    def overlay_ratio(self):
+        """Contexts held in CSR overlays relative to the base tables (0 when nothing to compact)."""
+        overlays = [t for t in self.ngram_counts.values() if isinstance(t, OverlayNGramTable)]
+        return sum(len(t.delta) for t in overlays) / max(sum(len(t.base) for t in overlays), 1)
+    
+    def compact(self):
+        """Fold CSR overlays back into plain CSR tables. O(model), so run it off the request path."""
+        if not any(isinstance(t, OverlayNGramTable) for t in self.ngram_counts.values()):
+            return False
+        words = sorted(self.vocabulary)
+        word_to_id = {w: i for i, w in enumerate(words)}
+        self.ngram_counts = {
+            k: t.compact(words, word_to_id) if isinstance(t, OverlayNGramTable) else t
+            for k, t in self.ngram_counts.items()
+        }
+        self._finalize()
+        return True
+    
     def get_next_word_probabilities(self, context):
         """Get probability distribution for next word given context."""
-        if context not in self.ngrams:
+        counts = self.ngrams.continuations(context)
+        if not counts:
             return {}
         
-        total = sum(self.ngrams[context].values())
+        total = sum(counts.values())
         if total == 0:
             return {}
         
-        return {word: count/total for word, count in self.ngrams[context].items()}
+        return {word: count/total for word, count in counts.items()}
     
     def generate_incomplete_lyric(self, min_length=5, max_length=10):
         """Generate an incomplete lyric line with a missing word."""
         if not self.ngrams:
             return None, None, []
         
-        available_contexts = list(self.ngrams.keys())
-        if not available_contexts:
+        with _CONTEXT_PICK.time():
+            context = self.ngrams.random_context()
+        if context is None:
             return None, None, []
         
-        context = random.choice(available_contexts)
         words = list(context)
         
         line_length = random.randint(min_length, max_length)
         
-        for _ in range(line_length - len(context)):
-            if context in self.ngrams and self.ngrams[context]:
-                probs = self.get_next_word_probabilities(context)
-                if probs:
-                    next_word = random.choices(list(probs.keys()), weights=list(probs.values()))[0]
-                    words.append(next_word)
-                    context = context[1:] + (next_word,)
-                else:
+        with _LINE_SAMPLING.time():
+            for _ in range(line_length - len(context)):
+                next_word = self.ngrams.sample_next(context)
+                if next_word is None:
                     break
-            else:
-                break
+                words.append(next_word)
+                context = context[1:] + (next_word,)
         
+        return self._blank_line(words)
+    
+    def generate_incomplete_lyrics(self, count, min_length=5, max_length=10):
+        """Batch version of generate_incomplete_lyric(); the lines are sampled in one table pass."""
+        if not self.ngrams or count <= 0:
+            return []
+        lengths = [random.randint(min_length, max_length) for _ in range(count)]
+        # sample_lines() draws the starting contexts too, so context_pick is part of this stage
+        with _LINE_SAMPLING.time():
+            lines = self.ngrams.sample_lines(lengths)
+        return [self._blank_line(words) for words in lines]
+    
+    def _blank_line(self, words):
+        """Blank out one inner word of a generated line and pick distractors for it."""
         if len(words) < 3:
             return None, None, []
         
@@ -268,71 +495,100 @@ class NGramModel:
         
         return incomplete_line, correct_word, distractors
     
+    @_DISTRACTORS.timed
     def generate_distractors(self, correct_word, context_words, num_distractors=4):
-        """Generate plausible but incorrect word options."""
-        distractors = []
-        
-        similar_words = set()
-        for context in self.ngrams:
-            if any(word in context for word in context_words):
-                similar_words.update(self.ngrams[context].keys())
-        
-        similar_words.discard(correct_word)
-        
-        random_words = list(self.vocabulary - {correct_word})
-        random.shuffle(random_words)
-        
-        candidate_words = list(similar_words) + random_words[:100]
-        random.shuffle(candidate_words)
+        """Generate plausible but incorrect word options.
+
+        Candidates are drawn from the inverted index (words that follow contexts sharing a word
+        with the line) mixed with up to 100 random vocabulary slots, without materialising or
+        shuffling either pool.
+        """
+        pools = self.ngrams.neighbor_pools(context_words)
+        pool_sizes = [len(pool) for pool in pools]
+        similar_total = sum(pool_sizes)
+        random_slots = min(100, max(len(self._vocab_list) - 1, 0))
         
-        for word in candidate_words:
+        distractors = []
+        attempts = 0
+        while len(distractors) < num_distractors and attempts < num_distractors * 20:
+            attempts += 1
+            pick = random.randrange(similar_total + random_slots) if similar_total + random_slots else None
+            if pick is None:
+                break
+            if pick < similar_total:
+                for pool, size in zip(pools, pool_sizes):
+                    if pick < size:
+                        word = pool[pick]
+                        break
+                    pick -= size
+            else:
+                word = self._vocab_list[random.randrange(len(self._vocab_list))]
             if word != correct_word and word not in distractors:
                 distractors.append(word)
-                if len(distractors) >= num_distractors:
-                    break
         
-        while len(distractors) < num_distractors and len(random_words) > 0:
-            word = random_words.pop()
-            if word != correct_word and word not in distractors:
-                distractors.append(word)
+        if len(distractors) < num_distractors:
+            distractors.extend(self._sample_vocabulary(num_distractors - len(distractors), {correct_word, *distractors}))
         
         return distractors[:num_distractors]
     
+    def _sample_vocabulary(self, k, exclude):
+        """Draw up to k distinct vocabulary words not in `exclude` using random indices."""
+        picked = []
+        available = len(self._vocab_list) - sum(1 for w in exclude if w in self.vocabulary)
+        k = min(k, max(available, 0))
+        seen = set(exclude)
+        while len(picked) < k:
+            word = self._vocab_list[random.randrange(len(self._vocab_list))]
+            if word not in seen:
+                seen.add(word)
+                picked.append(word)
+        return picked
+    
     def get_vocabulary_stats(self):
-        """Get statistics about the vocabulary and n-grams."""
-        return {
-            'vocabulary_size': len(self.vocabulary),
-            'ngram_count': len(self.ngrams),
-            'total_ngrams': sum(sum(counter.values()) for counter in self.ngrams.values())
-        }
+        """Get statistics about the vocabulary and n-grams (a copy of the maintained snapshot)."""
+        return dict(self._stats)
     
     def interpolated_prob(self, context, word, lambdas=(0.1, 0.3, 0.6)):
+        """Linear interpolation of the add-one smoothed unigram, bigram and trigram estimates."""
         unigram_prob = self.get_ngram_prob((), word, n=1)
         bigram_prob = self.get_ngram_prob((context[-1],), word, n=2) if len(context) >= 1 else 0
         trigram_prob = self.get_ngram_prob(context[-2:], word, n=3) if len(context) >= 2 else 0
 
         return lambdas[0]*unigram_prob + lambdas[1]*bigram_prob + lambdas[2]*trigram_prob
     
+    def backoff_prob(self, context, word, alpha=0.4):
+        """Stupid-backoff score: the highest order that has seen `word` after `context` wins,
+        discounted by `alpha` per order backed off. Not normalised; meant for ranking candidates.
+        """
+        weight = 1.0
+        for n in range(min(self.order, len(context) + 1), 0, -1):
+            context_tuple = tuple(context[-(n-1):]) if n > 1 else ()
+            count, total = self.ngram_counts[n].count_and_total(context_tuple, word)
+            if count:
+                return weight * count / total
+            weight *= alpha
+        return 0.0
+    
     def get_ngram_prob(self, context, word, n=2, smoothing=True):
-
+        """P(word | last n-1 words of context); totals come from the per-context cache."""
         counts = self.ngram_counts[n]
         vocab_size = len(self.vocab)
 
         context_tuple = tuple(context[-(n-1):]) if n > 1 else ()
-        numerator = counts[context_tuple].get(word, 0)
+        numerator, denominator = counts.count_and_total(context_tuple, word)
 
         if smoothing:
             numerator += 1
-            denominator = sum(counts[context_tuple].values()) + vocab_size
-        else:
-            denominator = sum(counts[context_tuple].values())
+            denominator += vocab_size
 
         return numerator / denominator if denominator > 0 else 0
-    
-    import math
 
     def perplexity(self, test_sequence, n=3):
+        """Perplexity of a token sequence under the add-one smoothed order-n model."""
         N = len(test_sequence)
+        predicted = N - (n - 1)
+        if predicted <= 0:
+            return float('inf')
         log_prob_sum = 0
 
         for i in range(n-1, N):
@@ -344,4 +600,4 @@ class NGramModel:
             else:
                 log_prob_sum += float('-inf')
 
-        return math.exp(-log_prob_sum / N)
\ No newline at end of file
+        return math.exp(-log_prob_sum / predicted)
@@ -0,0 +1,583 @@
+import random
+from bisect import bisect_right
+from collections import defaultdict, Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+# Every table exposes the same small interface so NGramModel does not care which one it holds:
+#   len(table), context in table, table[context] -> {word: count}, iteration over contexts,
+#   continuations(), count(), context_total(), count_and_total(), random_context(), sample_next(), sample_lines(),
+#   neighbor_pools(), neighbors(), total_count()
+# Call compile() once counting is finished; it caches per-context totals and builds the sampling
+# tables and the inverted word -> continuation index used for distractors.
+# add_counts() merges counts from new lyrics into a compiled table and returns the table to use
+# from then on; its cost scales with the number of contexts touched, not with the table.
+
+
+class DictNGramTable(defaultdict):
+    """The original backend: tuple-of-words contexts mapped to Counters of next words."""
+
+    def __init__(self):
+        super().__init__(Counter)
+        self._context_list: List[Tuple[str, ...]] = []
+        # context -> (next words, cumulative counts); sampled with bisect
+        self._samplers: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], List[int]]] = {}
+        # word -> distinct words seen after any context containing it
+        self._neighbors: Dict[str, Tuple[str, ...]] = {}
+        self._totals: Dict[Tuple[str, ...], int] = {}
+        self._total_count = 0
+
+    @classmethod
+    def from_arrays(cls, words: List[str], arrays: Dict[str, np.ndarray]) -> "DictNGramTable":
+        """Rebuild the dict layout from CSR arrays (as stored in the model artifact)."""
+        table = cls()
+        offsets = arrays["offsets"].tolist()
+        next_ids = arrays["next_ids"].tolist()
+        counts = arrays["counts"].tolist()
+        for row, ids in enumerate(arrays["contexts"].tolist()):
+            start, end = offsets[row], offsets[row + 1]
+            table[tuple(words[i] for i in ids)] = Counter(
+                {words[next_ids[j]]: counts[j] for j in range(start, end)}
+            )
+        return table
+
+    def compile(self) -> None:
+        """Precompute totals, seed contexts, a cumulative-count table per context and the neighbor index."""
+        self._context_list = [context for context, counter in self.items() if counter]
+        self._samplers = {}
+        self._totals = {}
+        neighbors = defaultdict(set)
+        for context in self._context_list:
+            self._compile_context(context)
+            for word in set(context):
+                neighbors[word].update(self[context].keys())
+        self._neighbors = {word: tuple(following) for word, following in neighbors.items()}
+        self._total_count = sum(self._totals.values())
+
+    def _compile_context(self, context, counter: Optional[Counter] = None) -> None:
+        if counter is None:
+            counter = self[context]
+        cumulative, running = [], 0
+        for count in counter.values():
+            running += count
+            cumulative.append(running)
+        self._samplers[context] = (tuple(counter.keys()), cumulative)
+        self._totals[context] = running
+
+    def add_counts(self, delta: Dict[Tuple[str, ...], Dict[str, int]]) -> "DictNGramTable":
+        """Merge extra counts into the compiled table, recompiling only the touched contexts.
+
+        Request threads may be iterating a context's Counter (continuations()), so each touched
+        Counter is copied, updated and swapped in rather than mutated.
+        """
+        following = defaultdict(set)
+        for context, counter in delta.items():
+            if not counter:
+                continue
+            merged = Counter(self.get(context, ()))
+            merged.update(counter)
+            self._compile_context(context, merged)
+            is_new = context not in self
+            self[context] = merged
+            if is_new:
+                self._context_list.append(context)
+            self._total_count += sum(counter.values())
+            for word in set(context):
+                following[word].update(counter.keys())
+        for word, nexts in following.items():
+            pool = self._neighbors.get(word, ())
+            missing = nexts.difference(pool)
+            if missing:
+                self._neighbors[word] = pool + tuple(missing)
+        return self
+
+    def continuations(self, context) -> Dict[str, int]:
+        return self[context] if context in self else {}
+
+    def count(self, context, word) -> int:
+        return self[context].get(word, 0) if context in self else 0
+
+    def context_total(self, context) -> int:
+        """Sum of continuation counts for `context` (cached by compile())."""
+        return self._totals.get(context, 0)
+
+    def count_and_total(self, context, word) -> Tuple[int, int]:
+        if context not in self:
+            return 0, 0
+        return self[context].get(word, 0), self._totals.get(context, 0)
+
+    def random_context(self) -> Optional[Tuple[str, ...]]:
+        return random.choice(self._context_list) if self._context_list else None
+
+    def sample_next(self, context) -> Optional[str]:
+        """Draw a next word in proportion to its count, or None for an unseen context."""
+        sampler = self._samplers.get(context)
+        if sampler is None:
+            return None
+        words, cumulative = sampler
+        return words[bisect_right(cumulative, random.randrange(cumulative[-1]))]
+
+    def sample_lines(self, lengths: Sequence[int]) -> List[List[str]]:
+        """Generate one line per requested length, each starting from a random context."""
+        return _sample_lines_stepwise(self, lengths)
+
+    def neighbor_pools(self, words: Iterable[str]) -> List[Sequence[str]]:
+        """One sequence per known word: the words seen after contexts containing it."""
+        return [self._neighbors[w] for w in set(words) if w in self._neighbors]
+
+    def neighbors(self, words: Iterable[str]) -> Set[str]:
+        """Every word seen after a context that contains one of `words`."""
+        similar = set()
+        for pool in self.neighbor_pools(words):
+            similar.update(pool)
+        return similar
+
+    def total_count(self) -> int:
+        return self._total_count
+
+
+class CSRNGramTable:
+    """Array-backed n-gram table.
+
+    Words are interned to int32 IDs (`words[i]` is the word with ID i). Contexts are rows of
+    `contexts`, sorted, with a packed int64 key per row for binary search. Row r's continuations
+    are `next_ids[offsets[r]:offsets[r + 1]]` with matching `counts` (CSR layout).
+    `alias_prob` / `alias_idx` share that layout and hold a Vose alias table per row, so drawing
+    a next word is O(1). `neighbor_ids[neighbor_offsets[w]:neighbor_offsets[w + 1]]` is the
+    inverted index: sorted IDs of every word seen after a context containing word w.
+    `row_totals[r]` caches the sum of row r's counts. Tables of different orders built over the
+    same vocabulary can share `words` / `word_to_id`.
+    """
+
+    def __init__(self, words: List[str], contexts: np.ndarray, context_keys: np.ndarray,
+                 offsets: np.ndarray, next_ids: np.ndarray, counts: np.ndarray,
+                 alias_prob: Optional[np.ndarray] = None, alias_idx: Optional[np.ndarray] = None,
+                 neighbor_offsets: Optional[np.ndarray] = None, neighbor_ids: Optional[np.ndarray] = None,
+                 row_totals: Optional[np.ndarray] = None, word_to_id: Optional[Dict[str, int]] = None):
+        self.words = words
+        self.word_to_id = word_to_id if word_to_id is not None else {w: i for i, w in enumerate(words)}
+        self.contexts = contexts
+        self.context_keys = context_keys
+        self.offsets = offsets
+        self.next_ids = next_ids
+        self.counts = counts
+        self.context_len = contexts.shape[1] if contexts.ndim == 2 else 0
+        if alias_prob is None or alias_idx is None:
+            alias_prob, alias_idx = build_alias_tables(offsets, counts)
+        self.alias_prob = alias_prob
+        self.alias_idx = alias_idx
+        if neighbor_offsets is None or neighbor_ids is None:
+            neighbor_offsets, neighbor_ids = build_neighbor_index(contexts, offsets, next_ids, len(words))
+        self.neighbor_offsets = neighbor_offsets
+        self.neighbor_ids = neighbor_ids
+        if row_totals is None:
+            row_totals = np.add.reduceat(counts.astype(np.int64), offsets[:-1]) if len(counts) else np.zeros(len(context_keys), dtype=np.int64)
+        self.row_totals = row_totals
+        self._total_count = int(row_totals.sum())
+
+    def compile(self) -> None:
+        """Sampling tables and the neighbor index are built in the constructor; nothing left to do."""
+
+    def add_counts(self, delta: Dict[Tuple[str, ...], Dict[str, int]]) -> "OverlayNGramTable":
+        """The arrays are read-only (often mmap'd): new counts go into an overlay table."""
+        return OverlayNGramTable(self).add_counts(delta)
+
+    @classmethod
+    def from_counts(cls, ngrams: Dict[Tuple[str, ...], Dict[str, int]], vocabulary: Iterable[str],
+                    words: Optional[List[str]] = None, word_to_id: Optional[Dict[str, int]] = None) -> "CSRNGramTable":
+        """Compile a dict-of-counters table into sorted ID arrays."""
+        if words is None:
+            words = sorted(vocabulary)
+        if word_to_id is None:
+            word_to_id = {w: i for i, w in enumerate(words)}
+
+        rows = sorted(
+            (tuple(word_to_id[w] for w in context), context)
+            for context, counter in ngrams.items() if counter
+        )
+        context_len = len(rows[0][0]) if rows else 0
+        contexts = np.array([ids for ids, _ in rows], dtype=np.int32).reshape(len(rows), context_len)
+
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        next_ids: List[int] = []
+        counts: List[int] = []
+        for r, (_, context) in enumerate(rows):
+            continuations = sorted((word_to_id[w], c) for w, c in ngrams[context].items())
+            next_ids.extend(i for i, _ in continuations)
+            counts.extend(c for _, c in continuations)
+            offsets[r + 1] = len(next_ids)
+
+        return cls(words, contexts, pack_keys(contexts, len(words)), offsets,
+                   np.array(next_ids, dtype=np.int32), np.array(counts, dtype=np.int32), word_to_id=word_to_id)
+
+    @classmethod
+    def from_arrays(cls, words: List[str], arrays: Dict[str, np.ndarray],
+                    word_to_id: Optional[Dict[str, int]] = None) -> "CSRNGramTable":
+        """Wrap existing (e.g. memory-mapped) arrays without copying them."""
+        return cls(words, arrays["contexts"], arrays["context_keys"], arrays["offsets"],
+                   arrays["next_ids"], arrays["counts"], arrays.get("alias_prob"), arrays.get("alias_idx"),
+                   arrays.get("neighbor_offsets"), arrays.get("neighbor_ids"), arrays.get("row_totals"),
+                   word_to_id=word_to_id)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "contexts": self.contexts,
+            "context_keys": self.context_keys,
+            "offsets": self.offsets,
+            "next_ids": self.next_ids,
+            "counts": self.counts,
+            "alias_prob": self.alias_prob,
+            "alias_idx": self.alias_idx,
+            "neighbor_offsets": self.neighbor_offsets,
+            "neighbor_ids": self.neighbor_ids,
+            "row_totals": self.row_totals,
+        }
+
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self.to_arrays().values())
+
+    # ---- lookups ----
+    def find(self, context) -> int:
+        """Row index of `context`, or -1 if it was never seen."""
+        if len(context) != self.context_len:
+            return -1
+        key = 0
+        vocab_size = len(self.words)
+        for word in context:
+            word_id = self.word_to_id.get(word)
+            if word_id is None:
+                return -1
+            key = key * vocab_size + word_id
+        row = int(np.searchsorted(self.context_keys, key))
+        if row < len(self.context_keys) and self.context_keys[row] == key:
+            return row
+        return -1
+
+    def context_at(self, row: int) -> Tuple[str, ...]:
+        return tuple(self.words[i] for i in self.contexts[row].tolist())
+
+    def row_continuations(self, row: int) -> Dict[str, int]:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        words = self.words
+        return {words[i]: c for i, c in zip(self.next_ids[start:end].tolist(), self.counts[start:end].tolist())}
+
+    def continuations(self, context) -> Dict[str, int]:
+        row = self.find(context)
+        return self.row_continuations(row) if row >= 0 else {}
+
+    def _row_count(self, row: int, word) -> int:
+        word_id = self.word_to_id.get(word)
+        if word_id is None:
+            return 0
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        # next_ids are sorted within each row
+        slot = start + int(np.searchsorted(self.next_ids[start:end], word_id))
+        return int(self.counts[slot]) if slot < end and self.next_ids[slot] == word_id else 0
+
+    def count(self, context, word) -> int:
+        row = self.find(context)
+        return self._row_count(row, word) if row >= 0 else 0
+
+    def context_total(self, context) -> int:
+        row = self.find(context)
+        return int(self.row_totals[row]) if row >= 0 else 0
+
+    def count_and_total(self, context, word) -> Tuple[int, int]:
+        """count() and context_total() with a single context lookup."""
+        row = self.find(context)
+        if row < 0:
+            return 0, 0
+        return self._row_count(row, word), int(self.row_totals[row])
+
+    def random_context(self) -> Optional[Tuple[str, ...]]:
+        return self.context_at(random.randrange(len(self))) if len(self) else None
+
+    def sample_next(self, context) -> Optional[str]:
+        row = self.find(context)
+        return self.sample_row(row) if row >= 0 else None
+
+    def sample_row(self, row: int) -> str:
+        """Draw a next word for row `row` from its alias table."""
+        start = int(self.offsets[row])
+        width = int(self.offsets[row + 1]) - start
+        slot = start + random.randrange(width) if width > 1 else start
+        if width > 1 and random.random() >= self.alias_prob[slot]:
+            slot = int(self.alias_idx[slot])
+        return self.words[self.next_ids[slot]]
+
+    def sample_lines(self, lengths: Sequence[int]) -> List[List[str]]:
+        """Vectorised sample_next(): every line advances one word per step in a single array pass."""
+        count = len(lengths)
+        if not count or not len(self):
+            return [[] for _ in range(count)]
+        rng = np.random.default_rng(random.getrandbits(64))
+        lengths = np.asarray(lengths, dtype=np.int64)
+        width = max(int(lengths.max()), self.context_len)
+        vocab_size = len(self.words)
+        modulus = vocab_size ** max(self.context_len - 1, 0)
+
+        rows = rng.integers(len(self), size=count)
+        keys = self.context_keys[rows]
+        ids = np.full((count, width), -1, dtype=np.int64)
+        ids[:, :self.context_len] = self.contexts[rows]
+        active = np.ones(count, dtype=bool)
+
+        for step in range(self.context_len, width):
+            live = np.flatnonzero(active & (lengths > step))
+            if not len(live):
+                break
+            starts = self.offsets[rows[live]]
+            widths = self.offsets[rows[live] + 1] - starts
+            slots = starts + (rng.random(len(live)) * widths).astype(np.int64)
+            keep = rng.random(len(live)) < self.alias_prob[slots]
+            slots = np.where(keep, slots, self.alias_idx[slots])
+            next_ids = self.next_ids[slots]
+            ids[live, step] = next_ids
+
+            # Shift the context window and look every new context up at once
+            new_keys = (keys[live] % modulus) * vocab_size + next_ids
+            found_rows = np.minimum(np.searchsorted(self.context_keys, new_keys), len(self) - 1)
+            found = self.context_keys[found_rows] == new_keys
+            rows[live] = found_rows
+            keys[live] = new_keys
+            active[live[~found]] = False
+
+        words = self.words
+        return [[words[i] for i in row if i >= 0] for row in ids.tolist()]
+
+    def neighbor_pools(self, words: Iterable[str]) -> List[Sequence[str]]:
+        pools = []
+        for word in set(words):
+            word_id = self.word_to_id.get(word)
+            if word_id is None:
+                continue
+            start, end = int(self.neighbor_offsets[word_id]), int(self.neighbor_offsets[word_id + 1])
+            if end > start:
+                pools.append(_WordView(self.words, self.neighbor_ids[start:end]))
+        return pools
+
+    def neighbors(self, words: Iterable[str]) -> Set[str]:
+        similar = set()
+        for pool in self.neighbor_pools(words):
+            similar.update(self.words[i] for i in pool.ids.tolist())
+        return similar
+
+    def total_count(self) -> int:
+        return self._total_count
+
+    # ---- mapping protocol, for code that still treats the table like a dict ----
+    def __len__(self) -> int:
+        return len(self.context_keys)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, context) -> bool:
+        return self.find(context) >= 0
+
+    def __getitem__(self, context) -> Dict[str, int]:
+        row = self.find(context)
+        if row < 0:
+            raise KeyError(context)
+        return self.row_continuations(row)
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        return (self.context_at(r) for r in range(len(self)))
+
+    def keys(self) -> Iterator[Tuple[str, ...]]:
+        return iter(self)
+
+    def values(self) -> Iterator[Dict[str, int]]:
+        return (self.row_continuations(r) for r in range(len(self)))
+
+    def items(self) -> Iterator[Tuple[Tuple[str, ...], Dict[str, int]]]:
+        return ((self.context_at(r), self.row_continuations(r)) for r in range(len(self)))
+
+
+class OverlayNGramTable:
+    """A CSRNGramTable plus a DictNGramTable of the counts added since it was built.
+
+    Lookups and totals add both tables up, and sample_next() first picks the base or the overlay
+    in proportion to their counts for the context, so draws follow the merged counts exactly.
+    random_context() is uniform over the union of contexts, like a rebuilt table. Line batches
+    fall back to the per-word sampler; compact() folds everything back into one CSR table.
+    """
+
+    def __init__(self, base: CSRNGramTable):
+        self.base = base
+        self.delta = DictNGramTable()
+        # Contexts the base table has never seen, for random_context()
+        self._new_contexts: List[Tuple[str, ...]] = []
+
+    def compile(self) -> None:
+        """Both tables are kept compiled by add_counts(); nothing left to do."""
+
+    def add_counts(self, delta: Dict[Tuple[str, ...], Dict[str, int]]) -> "OverlayNGramTable":
+        for context, counter in delta.items():
+            if counter and context not in self.delta and self.base.find(context) < 0:
+                self._new_contexts.append(context)
+        self.delta.add_counts(delta)
+        return self
+
+    def compact(self, words: List[str], word_to_id: Optional[Dict[str, int]] = None) -> CSRNGramTable:
+        """A single CSR table holding the merged counts; O(table), so run it off the request path."""
+        return CSRNGramTable.from_counts(self, words, words=words, word_to_id=word_to_id)
+
+    def continuations(self, context) -> Dict[str, int]:
+        merged = self.base.continuations(context)
+        for word, count in self.delta.continuations(context).items():
+            merged[word] = merged.get(word, 0) + count
+        return merged
+
+    def count(self, context, word) -> int:
+        return self.base.count(context, word) + self.delta.count(context, word)
+
+    def context_total(self, context) -> int:
+        return self.base.context_total(context) + self.delta.context_total(context)
+
+    def count_and_total(self, context, word) -> Tuple[int, int]:
+        base_count, base_total = self.base.count_and_total(context, word)
+        delta_count, delta_total = self.delta.count_and_total(context, word)
+        return base_count + delta_count, base_total + delta_total
+
+    def random_context(self) -> Optional[Tuple[str, ...]]:
+        size = len(self)
+        if not size:
+            return None
+        slot = random.randrange(size)
+        return self.base.context_at(slot) if slot < len(self.base) else self._new_contexts[slot - len(self.base)]
+
+    def sample_next(self, context) -> Optional[str]:
+        row = self.base.find(context)
+        base_total = int(self.base.row_totals[row]) if row >= 0 else 0
+        total = base_total + self.delta.context_total(context)
+        if not total:
+            return None
+        if random.randrange(total) < base_total:
+            return self.base.sample_row(row)
+        return self.delta.sample_next(context)
+
+    def sample_lines(self, lengths: Sequence[int]) -> List[List[str]]:
+        return _sample_lines_stepwise(self, lengths)
+
+    def neighbor_pools(self, words: Iterable[str]) -> List[Sequence[str]]:
+        words = set(words)
+        return self.base.neighbor_pools(words) + self.delta.neighbor_pools(words)
+
+    def neighbors(self, words: Iterable[str]) -> Set[str]:
+        words = set(words)
+        return self.base.neighbors(words) | self.delta.neighbors(words)
+
+    def total_count(self) -> int:
+        return self.base.total_count() + self.delta.total_count()
+
+    # ---- mapping protocol ----
+    def __len__(self) -> int:
+        return len(self.base) + len(self._new_contexts)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, context) -> bool:
+        return context in self.delta or context in self.base
+
+    def __getitem__(self, context) -> Dict[str, int]:
+        if context not in self:
+            raise KeyError(context)
+        return self.continuations(context)
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        yield from self.base
+        yield from self._new_contexts
+
+    def keys(self) -> Iterator[Tuple[str, ...]]:
+        return iter(self)
+
+    def values(self) -> Iterator[Dict[str, int]]:
+        return (self.continuations(context) for context in self)
+
+    def items(self) -> Iterator[Tuple[Tuple[str, ...], Dict[str, int]]]:
+        return ((context, self.continuations(context)) for context in self)
+
+
+def _sample_lines_stepwise(table, lengths: Sequence[int]) -> List[List[str]]:
+    """sample_lines() one word at a time through random_context() / sample_next()."""
+    lines = []
+    for length in lengths:
+        context = table.random_context()
+        if context is None:
+            lines.append([])
+            continue
+        words = list(context)
+        for _ in range(length - len(context)):
+            next_word = table.sample_next(context)
+            if next_word is None:
+                break
+            words.append(next_word)
+            context = context[1:] + (next_word,)
+        lines.append(words)
+    return lines
+
+
+class _WordView:
+    """Sequence of words backed by a slice of an ID array; avoids materialising the words."""
+
+    __slots__ = ("words", "ids")
+
+    def __init__(self, words: List[str], ids: np.ndarray):
+        self.words = words
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> str:
+        return self.words[self.ids[i]]
+
+
+def build_neighbor_index(contexts: np.ndarray, offsets: np.ndarray, next_ids: np.ndarray,
+                         vocab_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Invert the table into word ID -> sorted unique IDs of words following its contexts."""
+    row_of_slot = np.repeat(np.arange(len(contexts)), np.diff(offsets))
+    columns = contexts.shape[1] if contexts.ndim == 2 else 0
+    if not columns or not len(next_ids):
+        return np.zeros(vocab_size + 1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    owners = np.concatenate([contexts[row_of_slot, c] for c in range(columns)]).astype(np.int64)
+    pairs = np.unique(owners * vocab_size + np.tile(next_ids, columns).astype(np.int64))
+    neighbor_offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs // vocab_size, minlength=vocab_size), out=neighbor_offsets[1:])
+    return neighbor_offsets, (pairs % vocab_size).astype(np.int32)
+
+
+def build_alias_tables(offsets: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vose alias tables for every CSR row; alias indices are absolute positions in `counts`."""
+    bounds = offsets.tolist()
+    all_counts = counts.tolist()
+    prob = [1.0] * len(all_counts)
+    alias = list(range(len(all_counts)))
+    for row in range(len(bounds) - 1):
+        start, end = bounds[row], bounds[row + 1]
+        width = end - start
+        if width < 2:
+            continue
+        total = sum(all_counts[start:end])
+        scaled = [c * width / total for c in all_counts[start:end]]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            lo, hi = small.pop(), large.pop()
+            prob[start + lo] = scaled[lo]
+            alias[start + lo] = start + hi
+            scaled[hi] += scaled[lo] - 1.0
+            (small if scaled[hi] < 1.0 else large).append(hi)
+        # Leftovers are 1.0 up to float rounding and keep their defaults
+    return np.array(prob, dtype=np.float32), np.array(alias, dtype=np.int32)
+
+
+def pack_keys(contexts: np.ndarray, vocab_size: int) -> np.ndarray:
+    """Pack each context row of word IDs into one sortable int64 (base `vocab_size`)."""
+    keys = np.zeros(len(contexts), dtype=np.int64)
+    for col in range(contexts.shape[1] if contexts.ndim == 2 else 0):
+        keys = keys * vocab_size + contexts[:, col].astype(np.int64)
+    return keys
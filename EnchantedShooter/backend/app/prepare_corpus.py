@@ -1,15 +1,30 @@
-import pandas as pd
-import pickle
+"""Turn the raw corpus files into pickles and the model artifact.
+
+The server reads the artifact and the album JSON; the pickles are only a fallback for
+NGramModel when the album JSON is missing, and for offline tools. Each step pickles one raw
+source. A step is skipped when the manifest says its source and
+output are unchanged (by SHA-256). The remaining steps run in parallel in a process pool. Each
+output is verified against the checksum of the bytes that were pickled, without unpickling it
+again. Finally the model artifact is rebuilt if its fingerprint no longer matches, and
+data/processed/manifest.json records the files the server reads (the artifact's sources and
+the artifact) for corpus_manifest.stale_files().
+
+Usage (from app/): python prepare_corpus.py [--force] [--workers N]
+"""
+import argparse
+import hashlib
+import importlib.util
 import json
-from pathlib import Path
-import warnings
+import os
+import pickle
 import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Tuple
 
-warnings.filterwarnings(
-    "ignore",
-    category=UserWarning,
-    module="openpyxl.worksheet._reader"
-)
+import corpus_manifest
 
 project_root = Path(__file__).resolve().parents[1]
 raw_dir = project_root / "data" / "raw" / "taylor_swift"
@@ -21,59 +36,135 @@ json_file = raw_dir / "flat-song-lyrics.json"
 pickle_excel_file = processed_dir / "corpus_excel.pkl"
 pickle_json_file = processed_dir / "corpus_json.pkl"
 
-def pickle_excel(input_path: Path, output_path: Path):
-    """Read Excel and save as Pickle."""
-    if not input_path.exists():
-        raise FileNotFoundError(f"Excel file not found: {input_path}")
 
-    try:
-        df = pd.read_excel(input_path)
-        print(f"✅ Excel loaded: {df.shape[0]} rows, {df.shape[1]} columns")
-        
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, "wb") as f:
-            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
-        print(f"💾 Pickle saved at: {output_path}")
-        
-        # Verify the pickle
-        with open(output_path, "rb") as f:
-            test_load = pickle.load(f)
-        print(f"🔍 Verification: Reloaded {len(test_load)} rows")
-        
-    except Exception as e:
-        print(f"❌ Error processing Excel: {str(e)}")
-        raise
+def read_excel(input_path: Path):
+    """Read the workbook into a DataFrame; uses the much faster calamine engine when installed."""
+    import pandas as pd
+    warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl.worksheet._reader")
+    engine = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+    return pd.read_excel(input_path, engine=engine)
+
+
+def read_json(input_path: Path):
+    with open(input_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
-def pickle_json(input_path: Path, output_path: Path):
-    """Read JSON and save as Pickle."""
+# step name -> (raw source, pickled output, reader)
+STEPS: Dict[str, Tuple[Path, Path, Callable]] = {
+    "excel": (excel_file, pickle_excel_file, read_excel),
+    "json": (json_file, pickle_json_file, read_json),
+}
+
+
+def run_step(name: str) -> Dict:
+    """Pickle one source and verify the written file by checksum. Runs in a pool process."""
+    input_path, output_path, reader = STEPS[name]
     if not input_path.exists():
-        raise FileNotFoundError(f"JSON file not found: {input_path}")
+        raise FileNotFoundError(f"{name} source not found: {input_path}")
+    start = time.perf_counter()
+    data = reader(input_path)
+    payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    checksum = hashlib.sha256(payload).hexdigest()
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    # Verify what actually reached the disk, then publish it
+    if corpus_manifest.file_sha256(tmp_path) != checksum:
+        os.remove(tmp_path)
+        raise IOError(f"Checksum mismatch writing {output_path}")
+    os.replace(tmp_path, output_path)
+    return {"rows": len(data), "output_sha256": checksum, "seconds": time.perf_counter() - start}
+
+
+def _up_to_date(entry: Dict, source_sha256: str, output_path: Path) -> bool:
+    return (
+        entry is not None
+        and entry["source"]["sha256"] == source_sha256
+        and output_path.exists()
+        and not corpus_manifest.file_changed(entry["output"])
+    )
+
+
+def prepare(force: bool = False, workers: int = 0) -> bool:
+    """Run every out-of-date step, rebuild the artifact if needed and write the manifest.
+    Returns False if any step failed (the manifest keeps its previous entry for that step).
+    """
+    manifest = corpus_manifest.load_manifest(processed_dir) or {"steps": {}}
+    steps = manifest.setdefault("steps", {})
+    source_hashes = {}
+    todo = []
+    for name, (input_path, output_path, _) in STEPS.items():
+        if not input_path.exists():
+            print(f"❌ {name}: source not found: {input_path}")
+            continue
+        source_hashes[name] = corpus_manifest.file_sha256(input_path)
+        if not force and _up_to_date(steps.get(name), source_hashes[name], output_path):
+            print(f"⏭️  {name}: {output_path.name} is up to date")
+        else:
+            todo.append(name)
+
+    ok = len(source_hashes) == len(STEPS)
+    if todo:
+        workers = min(len(todo), workers or os.cpu_count() or 1)
+        if workers > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = {name: pool.submit(run_step, name) for name in todo}
+                results = {}
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        results[name] = e
+        else:
+            results = {}
+            for name in todo:
+                try:
+                    results[name] = run_step(name)
+                except Exception as e:
+                    results[name] = e
+
+        for name, result in results.items():
+            input_path, output_path, _ = STEPS[name]
+            if isinstance(result, Exception):
+                print(f"❌ {name}: {result}")
+                ok = False
+                continue
+            steps[name] = {
+                "source": corpus_manifest.file_record(input_path, source_hashes[name]),
+                "output": corpus_manifest.file_record(output_path, result["output_sha256"]),
+                "rows": result["rows"],
+                "prepared_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+            print(f"💾 {name}: {result['rows']} rows -> {output_path.name} in {result['seconds']:.2f}s (checksum verified)")
+
+    import model_artifact
+    model, written = model_artifact.build(force=force)
+    if written is None:
+        print(f"⏭️  artifact: {model.artifact_path.name} is up to date")
+    # What the server reads at startup: the model's sources (album JSON, metadata) and the artifact
+    manifest["runtime"] = [corpus_manifest.file_record(path) for path in model.source_files() or ()]
+    if model.artifact_path.exists():
+        manifest["runtime"].append(corpus_manifest.file_record(model.artifact_path))
+
+    corpus_manifest.write_manifest(manifest, processed_dir)
+    return ok
 
-    try:
-        with open(input_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_path, "wb") as f:
-            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
-        print(f"💾 Pickle saved at: {output_path}")
-        
-        with open(output_path, "rb") as f:
-            test_load = pickle.load(f)
-        print(f"🔍 Verification: Reloaded {len(test_load)} items")
-        
-    except Exception as e:
-        print(f"❌ Error processing JSON: {str(e)}")
-        raise
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="rebuild every output even if it is up to date")
+    parser.add_argument("--workers", type=int, default=0, help="pool processes (default: one per CPU)")
+    args = parser.parse_args()
     try:
-        pickle_excel(excel_file, pickle_excel_file)
-        pickle_json(json_file, pickle_json_file)
-
-        print("\n🎯 Both corpora have been pickled successfully!")
+        if not prepare(args.force, args.workers):
+            print("\n💥 Some steps failed, see above")
+            sys.exit(1)
+        print("\n🎯 Corpus is prepared and up to date!")
     except Exception as e:
         print(f"\n💥 Script failed: {str(e)}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,162 @@
+"""Opt-in per-request profiling.
+
+Only imported by api.py when PROFILE_REQUESTS or PROFILE_ADMIN_TOKEN is set, so the normal
+request path never sees it. A profiled request gets a cProfile.Profile that records:
+- the game-manager calls it makes through executors.run(), in whichever pool thread runs them;
+- the event loop while the request runs, unless another profiled request already holds it
+  (cProfile allows one profiler per thread). Loop work of concurrent requests shows up too.
+Only the slowest PROFILE_KEEP requests are kept on disk as .pstats files. Open them with
+`python -m pstats`, snakeviz, or flameprof/gprof2dot for a flame graph.
+"""
+import asyncio
+import cProfile
+import heapq
+import hmac
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import pstats
+
+from executors import executors
+
+DEFAULT_PROFILE_DIR = Path(__file__).resolve().parent.parent / "data" / "profiles"
+ADMIN_HEADER = b"x-profile-token"
+
+
+class ProfilingConfig:
+    """Sampling rate, admin token and where / how many profiles to keep."""
+
+    def __init__(self, sample_rate: float = 0.0, admin_token: Optional[str] = None,
+                 directory: Path = DEFAULT_PROFILE_DIR, keep: int = 20):
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token.encode("utf-8") if admin_token else None
+        self.directory = Path(directory)
+        self.keep = keep
+
+    @classmethod
+    def from_env(cls) -> "ProfilingConfig":
+        # Same parse as api.env_flag(), which decides whether this module is loaded at all
+        enabled = os.environ.get("PROFILE_REQUESTS", "").strip().lower() not in ("", "0", "false", "no")
+        return cls(
+            sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0.01)) if enabled else 0.0,
+            admin_token=os.environ.get("PROFILE_ADMIN_TOKEN") or None,
+            directory=os.environ.get("PROFILE_DIR", DEFAULT_PROFILE_DIR),
+            keep=int(os.environ.get("PROFILE_KEEP", 20)),
+        )
+
+
+class RequestProfile:
+    """Every cProfile run belonging to one request, merged when it is saved."""
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Start profiling the current thread, or return None if a profiler already runs here."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    def dump(self, path: Path) -> bool:
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return False
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+        return True
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def _profile_calls(fn: Callable) -> Callable:
+    """executors.call_wrapper: profile the call in its pool thread if its request is profiled."""
+    request_profile = _current.get()
+    if request_profile is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args):
+        profile = request_profile.start()
+        try:
+            return fn(*args)
+        finally:
+            if profile is not None:
+                profile.disable()
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles sampled or admin-requested HTTP requests."""
+
+    def __init__(self, app, config: Optional[ProfilingConfig] = None):
+        self.app = app
+        self.config = config or ProfilingConfig.from_env()
+        self.config.directory.mkdir(parents=True, exist_ok=True)
+        self._slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, file path)
+        self._lock = threading.Lock()
+        self._loop_busy = False
+        executors.call_wrapper = _profile_calls
+
+    def _wanted(self, scope) -> bool:
+        if self.config.admin_token is not None:
+            for name, value in scope.get("headers", ()):
+                if name == ADMIN_HEADER:
+                    # Constant-time, so response timing doesn't leak how much of the token matched
+                    return hmac.compare_digest(value, self.config.admin_token)
+        return self.config.sample_rate > 0 and random.random() < self.config.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_profile = RequestProfile()
+        token = _current.set(request_profile)
+        loop_profile = None
+        if not self._loop_busy:
+            loop_profile = request_profile.start()
+            self._loop_busy = loop_profile is not None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - start
+            if loop_profile is not None:
+                loop_profile.disable()
+                self._loop_busy = False
+            _current.reset(token)
+            await asyncio.to_thread(self._keep_if_slow, request_profile, elapsed, scope)
+
+    def _keep_if_slow(self, request_profile: RequestProfile, elapsed: float, scope) -> None:
+        with self._lock:
+            if len(self._slowest) >= self.config.keep and elapsed <= self._slowest[0][0]:
+                return
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_")[:60] or "root"
+            name = f"{elapsed * 1000:010.3f}ms-{scope.get('method', 'GET')}-{slug}-{time.time_ns()}.pstats"
+            path = self.config.directory / name
+            if not request_profile.dump(path):
+                return
+            heapq.heappush(self._slowest, (elapsed, str(path)))
+            while len(self._slowest) > self.config.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+RANDOM_MODE = "random"
+
+# mode -> (pool size, refill low watermark); override with QUESTION_POOL_<MODE>_SIZE / _LOW.
+# A song/part key is one line position, read once per pass through the part: one is enough
+DEFAULT_POOL_SIZES: Dict[str, Tuple[int, int]] = {
+    RANDOM_MODE: (32, 8),
+    "chorus": (1, 0),
+    "verse": (1, 0),
+    "bridge": (1, 0),
+    "default": (1, 0),
+}
+
+
+class PoolConfig:
+    """Pool sizes and refill watermarks per mode."""
+
+    def __init__(self, enabled: bool = True, sizes: Optional[Dict[str, Tuple[int, int]]] = None, max_keys: int = 512):
+        self.enabled = enabled
+        self.sizes = dict(DEFAULT_POOL_SIZES if sizes is None else sizes)
+        self.max_keys = max_keys
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        sizes = {}
+        for mode, (size, low) in DEFAULT_POOL_SIZES.items():
+            prefix = f"QUESTION_POOL_{mode.upper()}"
+            size = int(os.environ.get(f"{prefix}_SIZE", size))
+            low = int(os.environ.get(f"{prefix}_LOW", low))
+            sizes[mode] = (size, min(low, size))
+        return cls(
+            enabled=os.environ.get("QUESTION_POOL_ENABLED", "1") not in ("0", "false", "no"),
+            sizes=sizes,
+            max_keys=int(os.environ.get("QUESTION_POOL_MAX_KEYS", 512)),
+        )
+
+    def limits(self, mode: str) -> Tuple[int, int]:
+        return self.sizes.get(mode, self.sizes.get("default", (0, 0)))
+
+
+class QuestionPool:
+    """Bounded pools of ready-made questions, refilled by a background worker thread.
+
+    Keys are tuples whose first element is the mode: ("random",) for model-generated questions,
+    or (part, song, line_index) for the ordered song/part mode. `take()` never generates on the
+    request path; on a miss it returns None and the caller generates inline. Taking from a mode
+    key ("random",) queues it for refill below its watermark. A positional key is not refilled:
+    the caller will read the next position, so it prefetches that one instead. The worker
+    thread starts on first use and is recreated after os.fork().
+    """
+
+    def __init__(self, generator: Callable[[Tuple], Optional[Dict]], config: Optional[PoolConfig] = None):
+        self.generator = generator
+        self.config = config or PoolConfig.from_env()
+        self._pools: "OrderedDict[Tuple, deque]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._init_runtime()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_runtime)
+
+    def _init_runtime(self) -> None:
+        self._lock = threading.Lock()
+        self._refill_queue: "queue.SimpleQueue[Tuple]" = queue.SimpleQueue()
+        self._pending = set()
+        self._worker: Optional[threading.Thread] = None
+
+    @staticmethod
+    def mode_of(key: Tuple) -> str:
+        return str(key[0]).lower()
+
+    @staticmethod
+    def refills(key: Tuple) -> bool:
+        """Whether taking from `key` should top it up again (mode keys, not line positions)."""
+        return len(key) == 1
+
+    def _count(self, mode: str, name: str, n: int = 1) -> None:
+        counters = self._counters.setdefault(mode, {"hits": 0, "misses": 0, "generated": 0, "failed": 0})
+        counters[name] += n
+
+    def take(self, key: Tuple) -> Optional[Dict]:
+        """Pop a ready question for `key`, or return None (a miss) and schedule a refill."""
+        if not self.config.enabled:
+            return None
+        mode = self.mode_of(key)
+        size, low = self.config.limits(mode)
+        if size <= 0:
+            return None
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+            question = pool.popleft() if pool else None
+            self._count(mode, "hits" if question else "misses")
+            remaining = len(pool) if pool else 0
+        if remaining <= low and self.refills(key):
+            self.prefetch(key)
+        return question
+
+    def take_many(self, key: Tuple, count: int) -> List[Dict]:
+        """Pop up to `count` ready questions for `key`; each one missing counts as a miss."""
+        if not self.config.enabled or count <= 0:
+            return []
+        mode = self.mode_of(key)
+        size, low = self.config.limits(mode)
+        if size <= 0:
+            return []
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+            questions = [pool.popleft() for _ in range(min(count, len(pool)))] if pool else []
+            self._count(mode, "hits", len(questions))
+            self._count(mode, "misses", count - len(questions))
+            remaining = len(pool) if pool else 0
+        if remaining <= low and self.refills(key):
+            self.prefetch(key)
+        return questions
+
+    def prefetch(self, key: Tuple) -> None:
+        """Ask the worker to top up `key` to its pool size."""
+        if not self.config.enabled:
+            return
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._refill_queue.put(key)
+        self._ensure_worker()
+
+    def clear(self) -> None:
+        """Drop every ready question, e.g. after the corpus changed."""
+        with self._lock:
+            self._pools.clear()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="question-pool", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            key = self._refill_queue.get()
+            try:
+                self._fill(key)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+    def _fill(self, key: Tuple) -> None:
+        mode = self.mode_of(key)
+        size, _ = self.config.limits(mode)
+        while True:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = self._pools[key] = deque()
+                    while len(self._pools) > self.config.max_keys:
+                        self._pools.popitem(last=False)
+                if len(pool) >= size:
+                    return
+            try:
+                question = self.generator(key)
+            except Exception:
+                question = None
+            with self._lock:
+                if question is None:
+                    self._count(mode, "failed")
+                    return
+                pool.append(question)
+                self._count(mode, "generated")
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-mode configuration, ready question counts and hit/miss counters."""
+        with self._lock:
+            ready: Dict[str, int] = {}
+            keys: Dict[str, int] = {}
+            for key, pool in self._pools.items():
+                mode = self.mode_of(key)
+                ready[mode] = ready.get(mode, 0) + len(pool)
+                keys[mode] = keys.get(mode, 0) + 1
+            modes = set(self.config.sizes) | set(self._counters)
+            modes.discard("default")
+            result = {}
+            for mode in sorted(modes):
+                size, low = self.config.limits(mode)
+                counters = self._counters.get(mode, {"hits": 0, "misses": 0, "generated": 0, "failed": 0})
+                result[mode] = {
+                    "pool_size": size,
+                    "low_watermark": low,
+                    "keys": keys.get(mode, 0),
+                    "ready": ready.get(mode, 0),
+                    **counters,
+                }
+            return {"enabled": self.config.enabled, "modes": result}
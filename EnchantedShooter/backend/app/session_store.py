@@ -0,0 +1,379 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, Optional
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "sessions.db"
+
+
+class SessionConflict(Exception):
+    """Raised by save() when the session was saved by someone else since it was read."""
+
+
+class GameSession:
+    """Per-player game state. Slotted and lazily populated so idle sessions stay small."""
+
+    __slots__ = (
+        "session_id", "current_question", "score", "questions_answered", "created_at", "last_seen",
+        "song_title", "song_part", "part_index", "pending_questions", "version",
+    )
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.current_question: Optional[Dict] = None
+        self.score = 100
+        self.questions_answered = 0
+        self.created_at = time.time()
+        self.last_seen = time.monotonic()
+        # ordered playback cursor: position in the song/part's lines (see SongPartIndex)
+        self.song_title: Optional[str] = None
+        self.song_part: Optional[str] = None
+        self.part_index: int = 0
+        # questions handed out by a batch request, answered in order after current_question
+        self.pending_questions: Optional[Deque[Dict]] = None
+        # bumped by every save to a shared store; a save from a stale read is a conflict
+        self.version = 0
+
+
+class InMemorySessionStore:
+    """Process-local session store with idle TTL, an LRU size cap and eviction counters.
+
+    Sessions are kept in least-recently-used order, so expired ones are always at the front:
+    sweeping pops from the front until it meets a live session and costs O(expired).
+    Sweeps run lazily on access (at most every `sweep_interval` seconds) and from a daemon
+    thread that starts with the first session and is recreated after os.fork().
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_sessions: int = 100_000, sweep_interval: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._counters = {"created": 0, "deleted": 0, "evicted_ttl": 0, "evicted_lru": 0}
+        self._last_sweep = time.monotonic()
+        self._init_runtime()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_runtime)
+
+    @classmethod
+    def from_env(cls) -> "InMemorySessionStore":
+        return cls(
+            ttl_seconds=float(os.environ.get("SESSION_TTL_SECONDS", 3600)),
+            max_sessions=int(os.environ.get("SESSION_MAX", 100_000)),
+            sweep_interval=float(os.environ.get("SESSION_SWEEP_INTERVAL", 60)),
+        )
+
+    def _init_runtime(self) -> None:
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def _expired(self, session: GameSession, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - session.last_seen > self.ttl_seconds
+
+    def add(self, session: GameSession) -> None:
+        with self._lock:
+            session.last_seen = time.monotonic()
+            self._sessions[session.session_id] = session
+            self._counters["created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._counters["evicted_lru"] += 1
+        self._maybe_sweep()
+        self._ensure_sweeper()
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        """Return a live session and mark it as recently used."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._expired(session, now):
+                del self._sessions[session_id]
+                self._counters["evicted_ttl"] += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+        self._maybe_sweep()
+        return session
+
+    def save(self, session: GameSession) -> None:
+        """Persist changes to a session. Objects are shared in memory, so this only touches it."""
+        with self._lock:
+            if session.session_id in self._sessions:
+                session.last_seen = time.monotonic()
+                self._sessions.move_to_end(session.session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                return False
+            self._counters["deleted"] += 1
+            return True
+
+    def sweep(self) -> int:
+        """Drop every expired session; returns how many were removed."""
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            self._last_sweep = now
+            while self._sessions:
+                session = next(iter(self._sessions.values()))
+                if not self._expired(session, now):
+                    break
+                self._sessions.popitem(last=False)
+                removed += 1
+            self._counters["evicted_ttl"] += removed
+        return removed
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_forever, name="session-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self) -> None:
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            **self._counters,
+        }
+
+
+class SQLiteSessionStore:
+    """Session store in a local SQLite database (WAL mode) that every worker process can share.
+
+    Each thread keeps its own connection; reconnecting after fork is automatic. A session is
+    one row: score, progress, the current/pending questions as JSON and the song/part cursor
+    (title, part and position). Reads are a single primary-key SELECT and writes a single
+    statement, kept prepared by sqlite3's per-connection statement cache.
+    get() does not write; save() refreshes `last_seen`, which drives TTL expiry and LRU eviction.
+    save() is a compare-and-set on the row's `version`: if another thread or worker process
+    saved the session after it was read, nothing is written and SessionConflict is raised, so
+    the caller can redo its read-modify-write instead of silently overwriting that update.
+    Expired and overflowing rows are swept on add() and by a daemon thread (started on first use
+    and recreated after os.fork()), so they go away even when no new sessions arrive.
+    """
+
+    # Columns save() writes; the rest are fixed at creation or maintained by the store
+    _MUTABLE = ("score", "questions_answered", "current_question", "pending_questions",
+                "song_title", "song_part", "part_index", "last_seen")
+    _COLUMNS = ("session_id", *_MUTABLE, "created_at", "version")
+    _SELECT = f"SELECT {', '.join(_COLUMNS)} FROM sessions WHERE session_id = ?"
+    _UPSERT = (
+        f"INSERT INTO sessions ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+        "ON CONFLICT(session_id) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in _COLUMNS[1:] if c != "created_at")
+    )
+    _UPDATE = (
+        f"UPDATE sessions SET {', '.join(f'{c} = ?' for c in _MUTABLE)}, version = version + 1 "
+        "WHERE session_id = ? AND version = ?"
+    )
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl_seconds: float = 3600, max_sessions: int = 100_000,
+                 sweep_interval: float = 60):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._counters = {"created": 0, "deleted": 0, "evicted_ttl": 0, "evicted_lru": 0}
+        self._local = threading.local()
+        self._last_sweep = time.time()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect()
+        self._init_runtime()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._init_runtime)
+
+    @classmethod
+    def from_env(cls) -> "SQLiteSessionStore":
+        return cls(
+            path=os.environ.get("SESSION_DB_PATH", DEFAULT_DB_PATH),
+            ttl_seconds=float(os.environ.get("SESSION_TTL_SECONDS", 3600)),
+            max_sessions=int(os.environ.get("SESSION_MAX", 100_000)),
+            sweep_interval=float(os.environ.get("SESSION_SWEEP_INTERVAL", 60)),
+        )
+
+    def _init_runtime(self) -> None:
+        self._sweeper_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "conn", None) is not None and local.pid == os.getpid():
+            return local.conn
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, score INTEGER NOT NULL, questions_answered INTEGER NOT NULL, "
+            "current_question TEXT, pending_questions TEXT, song_title TEXT, song_part TEXT, "
+            "part_index INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, last_seen REAL NOT NULL) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}:
+            # Databases created before save() became a compare-and-set
+            try:
+                conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+        local.conn, local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _mutable_values(session: GameSession, now: float):
+        return (
+            session.score,
+            session.questions_answered,
+            json.dumps(session.current_question) if session.current_question else None,
+            json.dumps(list(session.pending_questions)) if session.pending_questions else None,
+            session.song_title,
+            session.song_part,
+            session.part_index,
+            now,
+        )
+
+    @classmethod
+    def _to_row(cls, session: GameSession, now: float):
+        return (session.session_id, *cls._mutable_values(session, now), session.created_at, session.version)
+
+    @staticmethod
+    def _from_row(row) -> GameSession:
+        (session_id, score, answered, current, pending, song_title, song_part,
+         part_index, last_seen, created_at, version) = row
+        session = GameSession(session_id)
+        session.score = score
+        session.questions_answered = answered
+        session.current_question = json.loads(current) if current else None
+        session.pending_questions = deque(json.loads(pending)) if pending else None
+        session.song_title = song_title
+        session.song_part = song_part
+        session.part_index = part_index
+        session.created_at = created_at
+        session.last_seen = last_seen
+        session.version = version
+        return session
+
+    def add(self, session: GameSession) -> None:
+        self._connect().execute(self._UPSERT, self._to_row(session, time.time()))
+        self._counters["created"] += 1
+        self._maybe_sweep()
+        self._ensure_sweeper()
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        self._ensure_sweeper()
+        row = self._connect().execute(self._SELECT, (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = self._from_row(row)
+        if self.ttl_seconds > 0 and time.time() - session.last_seen > self.ttl_seconds:
+            self._connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._counters["evicted_ttl"] += 1
+            return None
+        return session
+
+    def save(self, session: GameSession) -> None:
+        """Write the session back unless it was saved elsewhere since it was read (SessionConflict)."""
+        values = self._mutable_values(session, time.time())
+        if self._connect().execute(self._UPDATE, (*values, session.session_id, session.version)).rowcount == 0:
+            # Saved by another thread/worker since our read, or deleted meanwhile
+            raise SessionConflict(f"Session {session.session_id} was modified concurrently")
+        session.version += 1
+
+    def delete(self, session_id: str) -> bool:
+        deleted = self._connect().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+        if deleted:
+            self._counters["deleted"] += 1
+        return deleted
+
+    def sweep(self) -> int:
+        """Delete expired sessions, then the least recently used ones beyond the cap."""
+        conn = self._connect()
+        self._last_sweep = time.time()
+        removed = 0
+        if self.ttl_seconds > 0:
+            expired = conn.execute("DELETE FROM sessions WHERE last_seen < ?", (self._last_sweep - self.ttl_seconds,)).rowcount
+            self._counters["evicted_ttl"] += expired
+            removed += expired
+        overflow = conn.execute(
+            "DELETE FROM sessions WHERE session_id IN "
+            "(SELECT session_id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        ).rowcount
+        self._counters["evicted_lru"] += overflow
+        return removed + overflow
+
+    def _maybe_sweep(self) -> None:
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self.sweep_interval <= 0:
+            return
+        with self._sweeper_lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_forever, name="session-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self) -> None:
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except sqlite3.Error as e:
+                # e.g. the database is busy in another worker; try again next interval
+                print(f"⚠️  Session sweep failed: {e}")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def stats(self) -> Dict:
+        """Counters are per worker process; the session count is shared."""
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "sessions": len(self),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            **self._counters,
+        }
+
+
+SESSION_BACKENDS = {"memory": InMemorySessionStore, "sqlite": SQLiteSessionStore}
+
+
+def create_session_store(backend: Optional[str] = None):
+    """Session store selected by `backend` or the SESSION_BACKEND env var (default "memory")."""
+    backend = (backend or os.environ.get("SESSION_BACKEND") or "memory").lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend {backend!r}, expected one of {tuple(SESSION_BACKENDS)}")
+    return SESSION_BACKENDS[backend].from_env()
@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import re
+import unicodedata
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SEARCH_FIELDS = ("title", "album", "parts")
+TOKEN_RE = re.compile(r"[^\W_]+")
+# Per-token match quality, and how much a title hit outweighs an album hit
+EXACT, PREFIX, FUZZY = 3, 2, 1
+FIELD_WEIGHTS = {"title": 2, "album": 1}
+
+
+class RenderedCatalog:
+    """The /songs response, serialized (and optionally gzipped) once per catalogue version.
+
+    The ETag is a hash of the JSON body, so every worker serving the same catalogue hands out
+    the same tag; the gzip variant gets its own tag, as HTTP requires per encoding.
+    """
+
+    __slots__ = ("version", "body", "gzip_body", "etag", "gzip_etag")
+
+    def __init__(self, version: int, songs: List[Dict], compress: bool = True):
+        self.version = version
+        self.body = json.dumps({"songs": songs}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # mtime=0 keeps the compressed bytes identical across processes and restarts
+        self.gzip_body: Optional[bytes] = gzip.compress(self.body, compresslevel=9, mtime=0) if compress else None
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header matches either variant (weak comparison)."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip: its own q-value, else that of `*`.
+    A q of 0 (`gzip;q=0`) refuses it; an unparsable q counts as 0.
+    """
+    qualities: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+def search_tokens(text: str) -> List[str]:
+    """Case-folded, accent-stripped alphanumeric words of `text`."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return TOKEN_RE.findall("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+def _trigrams(token: str) -> List[str]:
+    padded = f"  {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def max_edits(token: str) -> int:
+    """Typos tolerated in a query word: none for 1-2 letters, one up to 5, then two."""
+    return 0 if len(token) <= 2 else 1 if len(token) <= 5 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a swap of neighbours is one edit), or limit + 1 when
+    it exceeds `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class SongSearchIndex:
+    """Title and album search over the song catalogue, for /songs/search.
+
+    Every query word must match a word of the song's title or album: exactly, as a prefix
+    (so results update while typing) or, failing both, within max_edits() typos. Prefixes are
+    found by bisecting the sorted word list. Typo candidates come from a trigram index over
+    the catalogue's distinct words and are verified with edit_distance(). A lookup therefore
+    touches the words that share letters with the query, not every song. Rankings of the last
+    `cache_size` distinct queries are kept, so paging and popular prefixes are a slice.
+    """
+
+    def __init__(self, version: int, songs: List[Dict], cache_size: int = 1024):
+        self.version = version
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, ...], Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # In list_songs() order (album, title), which also breaks score ties
+        self.songs = songs
+        postings: Dict[str, Dict[int, int]] = {}
+        for song_id, song in enumerate(songs):
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in search_tokens(song.get(field) or ""):
+                    entries = postings.setdefault(token, {})
+                    entries[song_id] = max(entries.get(song_id, 0), weight)
+        # word -> {song: field weight}
+        self._postings = postings
+        self._words = sorted(postings)
+        self._trigram_words: Dict[str, List[str]] = {}
+        for word in self._words:
+            for gram in set(_trigrams(word)):
+                self._trigram_words.setdefault(gram, []).append(word)
+
+    def _word_matches(self, token: str) -> Dict[str, int]:
+        """Catalogue words matching one query word, with their match quality."""
+        matches: Dict[str, int] = {}
+        words = self._words
+        i = bisect_left(words, token)
+        while i < len(words) and words[i].startswith(token):
+            matches[words[i]] = EXACT if words[i] == token else PREFIX
+            i += 1
+        limit = max_edits(token)
+        if limit and not matches:
+            grams = _trigrams(token)
+            shared = Counter(w for gram in set(grams) for w in self._trigram_words.get(gram, ()))
+            # An edit destroys at most three of the query's trigrams, a swap of neighbours four
+            needed = max(1, len(grams) - 4 * limit)
+            for word, count in shared.items():
+                if count >= needed and word not in matches and edit_distance(token, word, limit) <= limit:
+                    matches[word] = FUZZY
+        return matches
+
+    def _scores(self, tokens: List[str]) -> Dict[int, int]:
+        """Summed score of every song that matches all (distinct) query words."""
+        per_token = [self._word_matches(token) for token in tokens]
+        # Rarest word first, so the candidate set is small from the start
+        per_token.sort(key=lambda matches: sum(len(self._postings[w]) for w in matches))
+        scores: Optional[Dict[int, int]] = None
+        for matches in per_token:
+            token_scores: Dict[int, int] = {}
+            for word, quality in matches.items():
+                for song_id, weight in self._postings[word].items():
+                    if scores is None or song_id in scores:
+                        score = quality * weight
+                        if score > token_scores.get(song_id, 0):
+                            token_scores[song_id] = score
+            scores = {s: score + (scores[s] if scores else 0) for s, score in token_scores.items()}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def search(self, query: str) -> Sequence[int]:
+        """Positions in `songs` of every match, best first; every song for an empty query."""
+        tokens = tuple(dict.fromkeys(search_tokens(query)))
+        if not tokens:
+            return range(len(self.songs))
+        with self._lock:
+            ranked = self._cache.get(tokens)
+            if ranked is not None:
+                self._cache.move_to_end(tokens)
+                return ranked
+        scores = self._scores(list(tokens))
+        ranked = tuple(sorted(scores, key=lambda s: (-scores[s], s)))
+        with self._lock:
+            self._cache[tokens] = ranked
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return ranked
+
+    def page(self, query: str, offset: int = 0, limit: int = 20, fields: Sequence[str] = SEARCH_FIELDS) -> Dict:
+        """One page of search results, each song reduced to `fields`. An empty query pages
+        through the whole catalogue in list_songs() order.
+        """
+        ranked = self.search(query)
+        songs = [{f: self.songs[s][f] for f in fields} for s in ranked[offset:offset + limit]]
+        return {"query": query, "total": len(ranked), "offset": offset, "limit": limit, "songs": songs}
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """A comma-separated field list, validated against SEARCH_FIELDS (all of them if empty)."""
+    if not fields:
+        return SEARCH_FIELDS
+    wanted = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in wanted if f not in SEARCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s) {', '.join(unknown)}; expected some of {', '.join(SEARCH_FIELDS)}")
+    return wanted or SEARCH_FIELDS
@@ -0,0 +1,56 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Sequence, Tuple
+
+from corpus_store import CorpusStore
+
+
+class SongPartIndex:
+    """Playable lines of every (song, part), built once so song mode never scans a song.
+
+    `lines(song_id, part)` is the part's line IDs (into the CorpusStore) in Order, keeping only
+    lines with at least `min_words` words; `tokens(line_id)` is such a line pre-split on
+    whitespace, i.e. the blank candidates. A session then only needs a position in the list.
+    """
+
+    def __init__(self, corpus: CorpusStore, min_words: int = 3):
+        self.corpus = corpus
+        self.min_words = min_words
+        # (song ID, case-folded part) -> line IDs in playback order
+        self._lines: Dict[Tuple[int, str], array] = {}
+        self._tokens: Dict[int, Tuple[str, ...]] = {}
+        self._token_count = 0
+        self.add_songs(range(len(corpus.song_titles)))
+
+    def add_songs(self, song_ids: Iterable[int]) -> int:
+        """Index songs added to the store since construction. Returns how many lines were added."""
+        corpus = self.corpus
+        part_keys = [part.lower() for part in corpus.parts]
+        added = 0
+        for song_id in song_ids:
+            by_part: Dict[str, list] = {}
+            for line_id in range(corpus.song_lines[song_id], corpus.song_lines[song_id + 1]):
+                if corpus.line_words[line_id] >= self.min_words:
+                    by_part.setdefault(part_keys[corpus.line_part[line_id]], []).append(line_id)
+            for part_key, line_ids in by_part.items():
+                line_ids.sort(key=corpus.line_order.__getitem__)
+                self._lines[(song_id, part_key)] = array("I", line_ids)
+                for line_id in line_ids:
+                    # Interned: the same words recur across thousands of lines
+                    tokens = self._tokens[line_id] = tuple(sys.intern(w) for w in corpus.line_text(line_id).split())
+                    self._token_count += len(tokens)
+                added += len(line_ids)
+        return added
+
+    def lines(self, song_id: int, part: str) -> Sequence[int]:
+        return self._lines.get((song_id, part.lower()), ())
+
+    def tokens(self, line_id: int) -> Tuple[str, ...]:
+        return self._tokens[line_id]
+
+    def stats(self) -> Dict:
+        return {
+            "song_parts": len(self._lines),
+            "lines": len(self._tokens),
+            "tokens": self._token_count,
+        }
@@ -0,0 +1,70 @@
+import random
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class LengthBucketIndex:
+    """Case-folded vocabulary bucketed by word length, for O(k) similar-length draws.
+
+    Buckets and the word list only ever grow by appending, so add() costs O(words added) and a
+    concurrent sample() indexing below the length it read still sees valid words.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        folded = sorted({w.casefold() for w in words if w})
+        self.buckets: Dict[int, List[str]] = {}
+        for word in folded:
+            self.buckets.setdefault(len(word), []).append(word)
+        self.words: List[str] = folded
+        self._members: Set[str] = set(folded)
+
+    def add(self, words: Iterable[str]) -> int:
+        """Index extra words, appending each to its length bucket. Returns how many were new."""
+        fresh = sorted({w.casefold() for w in words if w}.difference(self._members))
+        for word in fresh:
+            self.buckets.setdefault(len(word), []).append(word)
+            self.words.append(word)
+        self._members.update(fresh)
+        return len(fresh)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def sample(self, target_len: int, k: int, exclude: Optional[Set[str]] = None, spread: int = 2) -> List[str]:
+        """Draw up to k distinct words whose length is within `spread` of `target_len`.
+
+        Falls back to the whole vocabulary when the neighbouring buckets run dry.
+        `exclude` must already be case-folded.
+        """
+        exclude = exclude or set()
+        picked: List[str] = []
+        seen = set(exclude)
+
+        pools = [self.buckets[n] for n in range(target_len - spread, target_len + spread + 1) if n in self.buckets]
+        self._draw(pools, k, seen, picked)
+        if len(picked) < k:
+            self._draw([self.words], k, seen, picked)
+        return picked
+
+    @staticmethod
+    def _draw(pools: List[List[str]], k: int, seen: Set[str], picked: List[str]) -> None:
+        total = sum(len(pool) for pool in pools)
+        # Bounded rejection sampling: duplicates and excluded words are rare unless the pools are tiny
+        attempts = 0
+        while len(picked) < k and total and attempts < k * 20:
+            attempts += 1
+            slot = random.randrange(total)
+            for pool in pools:
+                if slot < len(pool):
+                    word = pool[slot]
+                    break
+                slot -= len(pool)
+            if word not in seen:
+                seen.add(word)
+                picked.append(word)
+        if len(picked) < k and attempts >= k * 20:
+            # Tiny pools: fall back to an exhaustive pass so we never miss a valid word
+            remaining = [w for pool in pools for w in pool if w not in seen]
+            random.shuffle(remaining)
+            for word in remaining[:k - len(picked)]:
+                seen.add(word)
+                picked.append(word)
@@ -0,0 +1,197 @@
+"""In-process load test of the game API plus micro-benchmarks of the question path.
+
+Simulated players drive the FastAPI app through httpx's ASGI transport (no sockets), each
+playing create session -> (question -> check-answer) x rounds -> stats -> delete, in random
+mode or song/part mode. Reports p50/p95/p99 latency and throughput per endpoint.
+
+Usage (from backend/):
+    python benchmarks/api_load.py [--players 50] [--rounds 20] [--song-ratio 0.5] [--json] [--output run.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+PARTS = ("easy", "medium", "hard")
+# Settings that change what is being measured; recorded with every run
+ENV_KEYS = ("NGRAM_BACKEND", "SESSION_BACKEND", "EXECUTOR_MODE", "QUESTION_POOL_ENABLED")
+
+
+class Recorder:
+    """Latencies (seconds) and error counts per endpoint template."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response.json()
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict]:
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            ms = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            endpoints[name] = {
+                "requests": len(samples),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "mean_ms": float(ms.mean()),
+                "max_ms": float(ms.max()),
+                "throughput_rps": len(samples) / wall_seconds,
+            }
+        return endpoints
+
+
+async def play(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, rounds: int,
+               songs: List[str], song_mode: bool, accuracy: float) -> None:
+    session = await recorder.call(client, "POST /session", "POST", "/session")
+    if not session:
+        return
+    session_id = session["session_id"]
+    params = {"song": rng.choice(songs), "part": rng.choice(PARTS)} if song_mode and songs else {}
+    name = "GET /question (song)" if params else "GET /question (random)"
+    for _ in range(rounds):
+        question = await recorder.call(client, name, "GET", f"/question/{session_id}", params=params)
+        if not question:
+            continue
+        wrong = [o for o in question["options"] if o != question["correct_answer"]]
+        answer = question["correct_answer"] if rng.random() < accuracy or not wrong else rng.choice(wrong)
+        await recorder.call(client, "POST /check-answer", "POST", "/check-answer",
+                            json={"session_id": session_id, "selected_answer": answer})
+    await recorder.call(client, "GET /session/{id}/stats", "GET", f"/session/{session_id}/stats")
+    await recorder.call(client, "DELETE /session/{id}", "DELETE", f"/session/{session_id}")
+
+
+async def load_test(players: int, rounds: int, song_ratio: float, concurrency: int, accuracy: float, seed: int) -> Dict:
+    from api import app
+    from game_manager import game_manager
+
+    # The ASGI transport doesn't run startup hooks; measure a warm server
+    game_manager.load()
+
+    rng = random.Random(seed)
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        catalogue = await recorder.call(client, "GET /songs", "GET", "/songs")
+        songs = [s["title"] for s in (catalogue or {}).get("songs", [])]
+        limit = asyncio.Semaphore(concurrency)
+
+        async def player(i: int) -> None:
+            async with limit:
+                await play(client, recorder, random.Random(rng.random()), rounds, songs, i < players * song_ratio, accuracy)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(player(i) for i in range(players)))
+        wall = time.perf_counter() - start
+    total = sum(len(s) for s in recorder.latencies.values())
+    return {
+        "wall_s": wall,
+        "requests": total,
+        "errors": sum(recorder.errors.values()),
+        "throughput_rps": total / wall,
+        "endpoints": recorder.summary(wall),
+    }
+
+
+def time_per_call(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def micro_benchmarks(calls: int, seed: int) -> Dict[str, float]:
+    from game_manager import game_manager
+    from ngram_model import NGramModel
+
+    random.seed(seed)
+    model = game_manager.ngram_model
+    lines = [model.generate_incomplete_lyric() for _ in range(200)]
+    distractor_args = [(word, line.replace("___", word).split()) for line, word, _ in lines if word]
+    words = [(w,) for w, _ in distractor_args]
+    results = {
+        "generate_incomplete_lyric_us": time_per_call(model.generate_incomplete_lyric, [()] * calls),
+        "generate_distractors_us": time_per_call(model.generate_distractors, distractor_args * (calls // len(distractor_args) + 1)),
+        "pick_distractors_us": time_per_call(game_manager._pick_distractors, words * (calls // len(words) + 1)),
+    }
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        builder = NGramModel(use_artifact=False, backend=model.backend)
+        runs = []
+        for _ in range(3):
+            start = time.perf_counter()
+            builder.build_ngrams()
+            runs.append(time.perf_counter() - start)
+    results["build_ngrams_ms"] = min(runs) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20, help="questions answered per player")
+    parser.add_argument("--song-ratio", type=float, default=0.5, help="fraction of players in song/part mode")
+    parser.add_argument("--concurrency", type=int, default=50, help="players in flight at once")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="chance a player answers correctly")
+    parser.add_argument("--micro-calls", type=int, default=2000)
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {k: getattr(args, k) for k in ("players", "rounds", "song_ratio", "concurrency", "accuracy", "seed")},
+        "env": {k: os.environ.get(k) for k in ENV_KEYS},
+        "load": asyncio.run(load_test(args.players, args.rounds, args.song_ratio, args.concurrency, args.accuracy, args.seed)),
+    }
+    if not args.skip_micro:
+        report["micro"] = micro_benchmarks(args.micro_calls, args.seed)
+    from executors import executors
+    executors.shutdown()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    load = report["load"]
+    print(f"\n🎮 {args.players} players x {args.rounds} rounds: {load['requests']} requests, "
+          f"{load['errors']} errors, {load['throughput_rps']:.0f} req/s over {load['wall_s']:.2f}s")
+    print(f"{'endpoint':<28}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, row in load["endpoints"].items():
+        print(f"{name:<28}{row['requests']:>10}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+              f"{row['p99_ms']:>10.2f}{row['throughput_rps']:>10.0f}")
+    for name, value in report.get("micro", {}).items():
+        print(f"⏱️  {name:<32}{value:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
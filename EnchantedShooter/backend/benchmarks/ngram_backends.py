@@ -0,0 +1,87 @@
+"""Compare memory and lookup latency of the dict and CSR n-gram backends.
+
+Usage (from backend/):
+    python benchmarks/ngram_backends.py [--lookups 20000] [--json]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+from ngram_model import NGramModel  # noqa: E402
+from ngram_store import CSRNGramTable  # noqa: E402
+
+
+def deep_size_dict_table(table) -> int:
+    """Bytes held by a DictNGramTable, not counting the word strings (shared with the vocabulary)."""
+    size = sys.getsizeof(table)
+    for context, counter in table.items():
+        size += sys.getsizeof(context) + sys.getsizeof(counter)
+        size += sum(sys.getsizeof(c) for c in counter.values() if c > 256)  # small ints are cached
+    size += sys.getsizeof(table._context_list) + sys.getsizeof(table._samplers)
+    for words, cumulative in table._samplers.values():
+        size += sys.getsizeof(words) + sys.getsizeof(cumulative)
+        size += sum(sys.getsizeof(c) for c in cumulative if c > 256)
+    size += sys.getsizeof(table._neighbors) + sum(sys.getsizeof(n) for n in table._neighbors.values())
+    return size
+
+
+def size_csr_table(table: CSRNGramTable) -> int:
+    """Bytes held by a CSRNGramTable's arrays plus its ID lookup structures."""
+    return table.nbytes() + sys.getsizeof(table.words) + sys.getsizeof(table.word_to_id)
+
+
+def time_per_call(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def run(lookups: int) -> dict:
+    random.seed(0)
+    dict_model = NGramModel(use_artifact=False, backend="dict")
+    csr_model = NGramModel(use_artifact=False, backend="csr")
+
+    contexts = [dict_model.ngrams.random_context() for _ in range(lookups // 2)]
+    contexts += [("zzz", "qqq")] * (lookups - len(contexts))  # misses cost something too
+    random.shuffle(contexts)
+    args = [(c,) for c in contexts]
+
+    results = {}
+    for name, model, size in (
+        ("dict", dict_model, deep_size_dict_table(dict_model.ngrams)),
+        ("csr", csr_model, size_csr_table(csr_model.ngrams)),
+    ):
+        results[name] = {
+            "table_bytes": size,
+            "bytes_per_ngram": size / model.get_vocabulary_stats()["total_ngrams"],
+            "contains_us": time_per_call(model.ngrams.__contains__, args),
+            "next_word_probabilities_us": time_per_call(model.get_next_word_probabilities, args),
+            "generate_incomplete_lyric_us": time_per_call(model.generate_incomplete_lyric, [()] * 500),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.lookups)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    metrics = list(next(iter(results.values())))
+    print(f"\n{'metric':<32}" + "".join(f"{name:>14}" for name in results))
+    for metric in metrics:
+        print(f"{metric:<32}" + "".join(f"{r[metric]:>14.1f}" for r in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,168 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
 import uvicorn
-from app.api import app
 
-if __name__ == "__main__":
+APP_DIR = Path(__file__).resolve().parent / "app"
+
+
+def memory_usage(pid: int) -> dict:
+    """RSS / PSS and shared vs private resident memory of a process, in KiB (Linux only)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def log_memory(label: str, pids) -> None:
+    for pid in pids:
+        usage = memory_usage(pid)
+        if usage:
+            print(f"🧠 {label} {pid}: RSS {usage['rss'] / 1024:.1f} MiB, PSS {usage['pss'] / 1024:.1f} MiB, "
+                  f"shared {usage['shared'] / 1024:.1f} MiB, private {usage['private'] / 1024:.1f} MiB", flush=True)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> None:
+    gc.enable()
+    # The master skipped this so it wouldn't fork a process pool; start this worker's own
+    from executors import executors
+    executors.warm()
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run_prefork(host: str, port: int, workers: int, log_level: str, memory_report_delay: float) -> None:
+    """Load the model once, then fork `workers` uvicorn servers sharing one listening socket.
+
+    Children inherit the model, lyrics and indexes copy-on-write. GC is paused while loading and
+    everything allocated so far is moved to the permanent generation with gc.freeze(), so
+    collections in the workers don't write to (and un-share) those pages.
+    """
+    # Sessions must be visible to every worker; CSR tables are mmap'd numpy arrays, not objects
+    os.environ.setdefault("SESSION_BACKEND", "sqlite")
+    os.environ.setdefault("NGRAM_BACKEND", "csr")
+    # Tells GameManager that a corpus delta would only reach one worker
+    os.environ["SERVER_WORKERS"] = str(workers)
+
+    gc.disable()
+    sys.path.insert(0, str(APP_DIR))
+    from api import app
+    from game_manager import game_manager
+
+    # Load before forking so every worker shares it (the workers' startup hook is then a no-op)
+    game_manager.load(warm_executors=False)
+    gc.collect()
+    gc.freeze()
+    log_memory("master", [os.getpid()])
+
+    sock = bind_socket(host, port)
+    children = {}
+    shutting_down = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(app, sock, log_level)
+            finally:
+                os._exit(0)
+        children[pid] = slot
+
+    def shutdown(signum, frame) -> None:
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: log_memory("worker", list(children)))
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"🚀 Forked {workers} workers on http://{host}:{port} (send SIGUSR1 for a memory report)", flush=True)
+
+    report_at = time.monotonic() + memory_report_delay if memory_report_delay > 0 else None
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            slot = children.pop(pid, None)
+            if slot is not None and not shutting_down:
+                print(f"⚠️  Worker {pid} exited with status {status}, restarting")
+                spawn(slot)
+            continue
+        if report_at is not None and time.monotonic() >= report_at:
+            log_memory("worker", list(children))
+            report_at = None
+        time.sleep(0.2)
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Taylor Swift Lyric Guesser API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="fork this many workers from one preloaded master (production mode)")
+    parser.add_argument("--no-reload", action="store_true", help="disable auto-reload in single-process mode")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--memory-report-delay", type=float, default=5.0,
+                        help="seconds after forking to log per-worker memory (0 disables)")
+    args = parser.parse_args()
+
     print("🎵 Starting Taylor Swift Lyric Guesser API Server... 🎵")
-    print("📍 Server will be available at: http://localhost:8000")
-    print("📖 API documentation at: http://localhost:8000/docs")
-    print("🔍 Health check at: http://localhost:8000/health")
+    print(f"📍 Server will be available at: http://localhost:{args.port}")
+    print(f"📖 API documentation at: http://localhost:{args.port}/docs")
+    print(f"🔍 Health check at: http://localhost:{args.port}/health")
     print("\nPress Ctrl+C to stop the server")
-    
+
+    if args.workers > 1:
+        run_prefork(args.host, args.port, args.workers, args.log_level, args.memory_report_delay)
+        return
+
     uvicorn.run(
-        app, 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True,
-        log_level="info"
+        "api:app",
+        app_dir=str(APP_DIR),
+        host=args.host,
+        port=args.port,
+        reload=not args.no_reload,
+        log_level=args.log_level,
     )
+
+
+if __name__ == "__main__":
+    main()
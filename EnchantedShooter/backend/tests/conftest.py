@@ -0,0 +1,60 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app modules import each other flat (as when run from app/)
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+LINES = [
+    "we are never ever getting back together",
+    "we are never going to be the same again",
+    "you belong with me and you know it now",
+    "shake it off shake it off shake it off",
+    "we are never ever ever getting back together",
+    "you need to calm down you are being too loud",
+    "and I shake it off I shake it off tonight",
+]
+
+
+@pytest.fixture
+def lines():
+    return list(LINES)
+
+
+# Two songs in the album-song-lyrics.json schema; Verse lines are out of Order on purpose
+ALBUMS = [{"Code": "TST", "Title": "Test Album", "Songs": [
+    {"TrackNumber": 1, "Title": "Never Ever", "Lyrics": [
+        {"Order": 2, "Text": LINES[1], "SongPart": "Verse"},
+        {"Order": 1, "Text": LINES[0], "SongPart": "Verse"},
+        {"Order": 3, "Text": "oh oh", "SongPart": "Verse"},
+        {"Order": 4, "Text": LINES[4], "SongPart": "Chorus"},
+    ]},
+    {"TrackNumber": 2, "Title": "Shake", "Lyrics": [
+        {"Order": i, "Text": line, "SongPart": "Chorus"} for i, line in enumerate(LINES[2:], 1)
+    ]},
+]}]
+
+
+@pytest.fixture
+def album_json(tmp_path):
+    path = tmp_path / "album-song-lyrics.json"
+    path.write_text(json.dumps(ALBUMS), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def manager(album_json, monkeypatch):
+    """A loaded GameManager over ALBUMS, with in-memory sessions and an empty question pool."""
+    monkeypatch.setenv("SESSION_BACKEND", "memory")
+    monkeypatch.setenv("QUESTION_POOL_ENABLED", "0")
+    from corpus_store import CorpusStore
+    from game_manager import GameManager
+    load = CorpusStore.from_album_json
+    monkeypatch.setattr(CorpusStore, "from_album_json", staticmethod(lambda path=None: load(album_json)))
+    manager = GameManager()
+    manager.load(warm_executors=False)
+    return manager
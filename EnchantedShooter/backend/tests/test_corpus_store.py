@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from corpus_store import CorpusStore, iter_json_array
+
+# The album-song-lyrics.json schema
+ALBUMS = [
+    {"Code": "AAA", "Title": "First Album — ünïcödé", "SubTitle": "", "Year": 2006, "Songs": [
+        {"TrackNumber": 1, "Title": "Song One", "FromTheVault": False, "FeaturedArtists": [], "Lyrics": [
+            {"Order": 2, "Text": "a line with [brackets], {braces} and \"quotes\"", "SongPart": "Verse"},
+            {"Order": 1, "Text": "the first line of the first verse", "SongPart": "Verse"},
+            {"Order": 3, "Text": "and the chorus comes in", "SongPart": "Chorus"},
+        ]},
+        {"TrackNumber": 2, "Title": "Song Two", "FromTheVault": True, "FeaturedArtists": ["Someone"], "Lyrics": [
+            {"Order": 1, "Text": "short", "SongPart": "Bridge"},
+            {"Order": 2, "Text": None, "SongPart": "Bridge"},
+        ]},
+    ]},
+    {"Code": "BBB", "Title": "Second " + "long " * 200, "SubTitle": "", "Year": 2008, "Songs": []},
+]
+
+
+def write_albums(tmp_path, **dump_kwargs):
+    path = tmp_path / "album-song-lyrics.json"
+    path.write_text(json.dumps(ALBUMS, ensure_ascii=False, **dump_kwargs), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 64, 1 << 16])
+def test_iter_json_array_across_chunk_boundaries(tmp_path, chunk_size):
+    path = write_albums(tmp_path, indent=2)
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ALBUMS
+
+
+def test_iter_json_array_compact_separators(tmp_path):
+    path = write_albums(tmp_path, separators=(",", ":"))
+    assert list(iter_json_array(path, chunk_size=5)) == ALBUMS
+
+
+@pytest.mark.parametrize("text", ["[]", "  [ ]  ", "\n[\n]\n"])
+def test_iter_json_array_empty(tmp_path, text):
+    path = tmp_path / "empty.json"
+    path.write_text(text, encoding="utf-8")
+    assert list(iter_json_array(path, chunk_size=1)) == []
+
+
+def test_iter_json_array_rejects_non_arrays(tmp_path):
+    path = tmp_path / "object.json"
+    path.write_text('{"Songs": []}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(path))
+
+
+def test_from_album_json_columns(tmp_path):
+    store = CorpusStore.from_album_json(write_albums(tmp_path, indent=2))
+    # The empty album adds no songs
+    assert store.albums == [("AAA", "First Album — ünïcödé")]
+    assert store.song_titles == ["Song One", "Song Two"]
+    assert store.find_song(" song two ") == 1
+    assert list(store.song_lines) == [0, 3, 5]
+    assert store.song_parts == [("Verse", "Chorus"), ("Bridge",)]
+    assert [store.line_text(i) for i in range(3)] == [line["Text"] for line in ALBUMS[0]["Songs"][0]["Lyrics"]]
+    assert list(store.line_order[:3]) == [2, 1, 3]
+    assert store.line_text(4) == ""  # a missing text is kept as an empty line
+    assert list(store.line_words) == [7, 7, 5, 1, 0]
+    assert store.parts[store.line_part[2]] == "Chorus"
+
+
+def test_from_album_json_missing_file_is_empty(tmp_path):
+    store = CorpusStore.from_album_json(tmp_path / "missing.json")
+    assert store.song_titles == []
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from executors import ExecutorConfig, Executors
+
+
+def test_failed_submit_releases_its_slot():
+    ex = Executors(ExecutorConfig(mode="thread", threads=1, limits={"default": (1.0, 1)}))
+    # A pool that is shut down under the manager refuses new work at submit time
+    ex._thread_pool().shutdown()
+    for _ in range(2):
+        # The second call would be Overloaded if the first one had leaked its slot
+        with pytest.raises(RuntimeError):
+            asyncio.run(ex.run("question", lambda: 1))
+    endpoint = ex.stats()["endpoints"]["question"]
+    assert endpoint["in_flight"] == 0
+    assert endpoint["failed"] == 2
+    assert endpoint["rejected"] == 0
+
+
+def test_run_counts_completed_calls():
+    ex = Executors(ExecutorConfig(mode="thread", threads=1))
+    assert asyncio.run(ex.run("question", lambda x: x * 2, 21)) == 42
+    endpoint = ex.stats()["endpoints"]["question"]
+    assert endpoint["in_flight"] == 0
+    assert endpoint["completed"] == 1
+    ex.shutdown()
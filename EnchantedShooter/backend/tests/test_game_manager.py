@@ -0,0 +1,42 @@
+import pytest
+
+from game_manager import CorpusDeltaRejected, GameManager
+
+EXTRA = ["we are never ever coming back to this town again"]
+
+
+def test_corpus_deltas_are_rejected_when_processes_would_diverge(monkeypatch):
+    manager = GameManager()
+    monkeypatch.setenv("SERVER_WORKERS", "2")
+    with pytest.raises(CorpusDeltaRejected):
+        manager.apply_corpus_delta(lines=EXTRA)
+    monkeypatch.setenv("SERVER_WORKERS", "1")
+    assert manager.corpus_delta_blocker() is None
+
+
+def test_batch_answers_are_checked_in_the_order_returned(manager):
+    session_id = manager.create_session()
+    questions = manager.get_questions(session_id, 4)
+    assert len(questions) == 4
+    for i, question in enumerate(questions):
+        answer = question["correct_answer"] if i % 2 == 0 else "definitely-wrong"
+        result = manager.check_answer(session_id, answer)
+        assert result["correct"] == (i % 2 == 0)
+        assert result["correct_answer"] == question["correct_answer"]
+        assert result["questions_remaining"] == len(questions) - i - 1
+    assert manager.check_answer(session_id, "anything") == {"error": "No current question"}
+    stats = manager.get_session_stats(session_id)
+    assert (stats["score"], stats["questions_answered"]) == (80, 4)
+
+
+def test_single_question_replaces_a_pending_batch(manager):
+    session_id = manager.create_session()
+    manager.get_questions(session_id, 3)
+    question = manager.get_question(session_id)
+    result = manager.check_answer(session_id, question["correct_answer"])
+    assert result["correct"] and result["questions_remaining"] == 0
+
+
+def test_unknown_session(manager):
+    assert manager.get_questions("missing", 3) is None
+    assert manager.check_answer("missing", "x") == {"error": "Invalid session"}
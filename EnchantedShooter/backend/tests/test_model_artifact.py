@@ -0,0 +1,81 @@
+import pickle
+
+import model_artifact
+from ngram_model import NGramModel
+from ngram_store import CSRNGramTable
+
+
+def write_corpus(path, lines):
+    with open(path, "wb") as f:
+        pickle.dump(lines, f)
+
+
+def counts(model):
+    return {n: {c: dict(t.continuations(c)) for c in t} for n, t in model.ngram_counts.items()}
+
+
+def test_artifact_round_trip(tmp_path, lines):
+    corpus_path = tmp_path / "corpus_json.pkl"
+    write_corpus(corpus_path, lines)
+    built = NGramModel(corpus_path, use_artifact=False, backend="dict")
+    assert not built.from_artifact
+
+    model, written = model_artifact.build(corpus_path, force=True)
+    assert written == tmp_path / model_artifact.ARTIFACT_NAME and written.exists()
+
+    for backend in ("csr", "dict"):
+        loaded = NGramModel(corpus_path, backend=backend)
+        assert loaded.from_artifact
+        assert loaded.vocabulary == built.vocabulary
+        assert counts(loaded) == counts(built)
+
+    # An up-to-date artifact is kept
+    assert model_artifact.build(corpus_path, force=False)[1] is None
+
+
+def test_backend_defaults_to_dict_unless_configured(tmp_path, lines, monkeypatch):
+    corpus_path = tmp_path / "corpus_json.pkl"
+    write_corpus(corpus_path, lines)
+    model_artifact.build(corpus_path, force=True)
+    monkeypatch.delenv("NGRAM_BACKEND", raising=False)
+    assert NGramModel(corpus_path).backend == "dict"
+    monkeypatch.setenv("NGRAM_BACKEND", "csr")
+    model = NGramModel(corpus_path)
+    assert model.from_artifact and isinstance(model.ngrams, CSRNGramTable)
+
+
+def test_stale_fingerprint_is_rejected(tmp_path, lines):
+    corpus_path = tmp_path / "corpus_json.pkl"
+    write_corpus(corpus_path, lines)
+    model_artifact.build(corpus_path, force=True)
+    artifact_path = tmp_path / model_artifact.ARTIFACT_NAME
+    fingerprint = model_artifact.source_fingerprint([corpus_path])
+    assert model_artifact.load_artifact(artifact_path, fingerprint) is not None
+    assert model_artifact.load_artifact(artifact_path, "0" * 64) is None
+
+    # Editing the corpus changes the fingerprint, so the model is rebuilt from the corpus
+    write_corpus(corpus_path, lines + ["a brand new line that was never in the corpus"])
+    rebuilt = NGramModel(corpus_path)
+    assert not rebuilt.from_artifact
+    assert "brand" in rebuilt.vocabulary
+
+
+def test_metadata_tsvs_are_part_of_the_fingerprint(tmp_path, lines):
+    corpus_path = tmp_path / "corpus_json.pkl"
+    write_corpus(corpus_path, lines)
+    metadata = tmp_path / "metadata"
+    metadata.mkdir()
+    tsv = metadata / "songs.tsv"
+    tsv.write_text("id\ttitle\n1\tSomething\n", encoding="utf-8")
+    model_artifact.build(corpus_path, force=True)
+    assert NGramModel(corpus_path).from_artifact
+
+    tsv.write_text("id\ttitle\n1\tSomething else\n", encoding="utf-8")
+    assert not NGramModel(corpus_path).from_artifact
+
+
+def test_corrupt_artifact_is_ignored(tmp_path):
+    artifact_path = tmp_path / model_artifact.ARTIFACT_NAME
+    artifact_path.write_bytes(b"not an artifact at all")
+    assert model_artifact.load_artifact(artifact_path) is None
+    assert model_artifact.load_artifact(tmp_path / "missing.bin") is None
@@ -0,0 +1,111 @@
+import json
+import random
+
+import pytest
+
+from corpus_store import CorpusStore
+from ngram_model import NGramModel
+from ngram_store import CSRNGramTable, OverlayNGramTable
+
+EXTRA = [
+    "we are never ever coming back to this town again",
+    "you belong with me and you belong right here",
+]
+
+
+def table_counts(table):
+    return {context: dict(table.continuations(context)) for context in table}
+
+
+@pytest.fixture
+def models(lines):
+    return NGramModel(lines=lines, backend="dict"), NGramModel(lines=lines, backend="csr")
+
+
+def test_csr_matches_dict_counts(models):
+    dict_model, csr_model = models
+    assert isinstance(csr_model.ngrams, CSRNGramTable)
+    assert csr_model.vocabulary == dict_model.vocabulary
+    for n, dict_table in dict_model.ngram_counts.items():
+        csr_table = csr_model.ngram_counts[n]
+        assert table_counts(csr_table) == table_counts(dict_table)
+        assert csr_table.total_count() == dict_table.total_count()
+        for context in dict_table:
+            assert csr_table.context_total(context) == dict_table.context_total(context)
+    assert csr_model.get_vocabulary_stats() == dict_model.get_vocabulary_stats()
+
+
+def test_csr_matches_dict_probabilities(models):
+    dict_model, csr_model = models
+    for context in dict_model.ngrams:
+        assert csr_model.get_next_word_probabilities(context) == pytest.approx(
+            dict_model.get_next_word_probabilities(context))
+        for word in dict_model.ngrams[context]:
+            assert csr_model.interpolated_prob(context, word) == pytest.approx(
+                dict_model.interpolated_prob(context, word))
+    assert csr_model.get_next_word_probabilities(("not", "a-context")) == {}
+
+
+def test_sampling_stays_within_observed_continuations(models):
+    random.seed(7)
+    for model in models:
+        for context in model.ngrams:
+            support = set(model.ngrams.continuations(context))
+            assert {model.ngrams.sample_next(context) for _ in range(50)} <= support
+        assert model.ngrams.sample_next(("not", "a-context")) is None
+
+
+def test_overlay_matches_dict_after_add_lines(models):
+    dict_model, csr_model = models
+    assert dict_model.add_lines(EXTRA) == csr_model.add_lines(EXTRA)
+    assert isinstance(csr_model.ngrams, OverlayNGramTable)
+    for n, dict_table in dict_model.ngram_counts.items():
+        overlay = csr_model.ngram_counts[n]
+        assert table_counts(overlay) == table_counts(dict_table)
+        assert overlay.total_count() == dict_table.total_count()
+    random.seed(11)
+    for context in dict_model.ngrams:
+        support = set(dict_model.ngrams.continuations(context))
+        assert {csr_model.ngrams.sample_next(context) for _ in range(50)} <= support
+
+    # Compacting folds the overlay back into plain CSR without changing any count
+    assert csr_model.compact()
+    assert isinstance(csr_model.ngrams, CSRNGramTable)
+    assert table_counts(csr_model.ngrams) == table_counts(dict_model.ngrams)
+
+
+def test_rebuild_matches_incremental_add(lines):
+    incremental = NGramModel(lines=lines, backend="dict")
+    incremental.add_lines(EXTRA + lines)  # already-known lines are ignored
+    rebuilt = NGramModel(lines=lines + EXTRA, backend="dict")
+    for n, table in rebuilt.ngram_counts.items():
+        assert table_counts(incremental.ngram_counts[n]) == table_counts(table)
+
+
+def test_add_lines_grows_the_vocabulary_list_in_place(models):
+    for model in models:
+        vocab_list = model._vocab_list
+        size = len(vocab_list)
+        result = model.add_lines(EXTRA)
+        assert model._vocab_list is vocab_list
+        assert vocab_list[size:] == result["words"] == sorted(set(result["words"]))
+        assert {"town", "coming", "right", "here", "this"} <= set(result["words"])
+        # Re-sending the same lines counts nothing
+        assert model.add_lines(EXTRA) == {"lines": 0, "words": []}
+
+
+def test_known_lines_come_from_the_store_at_load_time(tmp_path, lines, monkeypatch):
+    albums = [{"Code": "AAA", "Title": "Album", "Songs": [
+        {"TrackNumber": 1, "Title": "Song", "Lyrics": [
+            {"Order": i, "Text": line, "SongPart": "Verse"} for i, line in enumerate(lines, 1)]},
+    ]}]
+    path = tmp_path / "album-song-lyrics.json"
+    path.write_text(json.dumps(albums), encoding="utf-8")
+    model = NGramModel(use_artifact=False, corpus=CorpusStore.from_album_json(path))
+    assert model._known_lines == set(lines)
+
+    def no_rescan():
+        raise AssertionError("add_lines() reloaded the corpus")
+    monkeypatch.setattr(model, "load_corpus", no_rescan)
+    assert model.add_lines(lines + EXTRA)["lines"] == len(EXTRA)
+
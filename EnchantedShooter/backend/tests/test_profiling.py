@@ -0,0 +1,23 @@
+import pytest
+
+from api import env_flag
+from profiling import ProfilingConfig
+
+
+@pytest.mark.parametrize("value, enabled", [
+    (None, False), ("", False), ("0", False), ("false", False), ("False", False), ("no", False), (" 0 ", False),
+    ("1", True), ("true", True), ("yes", True),
+])
+def test_profile_requests_flag(monkeypatch, value, enabled):
+    if value is None:
+        monkeypatch.delenv("PROFILE_REQUESTS", raising=False)
+    else:
+        monkeypatch.setenv("PROFILE_REQUESTS", value)
+    assert env_flag("PROFILE_REQUESTS") is enabled
+    # The middleware's own config agrees with the gate that installs it
+    assert (ProfilingConfig.from_env().sample_rate > 0) is enabled
+
+
+def test_admin_token_is_compared_as_bytes(monkeypatch):
+    monkeypatch.setenv("PROFILE_ADMIN_TOKEN", "s3cret")
+    assert ProfilingConfig.from_env().admin_token == b"s3cret"
@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from question_pool import RANDOM_MODE, PoolConfig, QuestionPool
+
+RANDOM_KEY = (RANDOM_MODE,)
+
+
+class Generator:
+    """Counts calls per key and hands out numbered questions."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = {}
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        if self.fail:
+            raise RuntimeError("no lyrics")
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            return {"key": key, "n": self.calls[key]}
+
+
+def settle(pool: QuestionPool, timeout: float = 5.0) -> None:
+    """Wait until the refill worker has nothing queued."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with pool._lock:
+            if not pool._pending:
+                return
+        time.sleep(0.005)
+    raise AssertionError("question pool did not settle")
+
+
+def make_pool(generator, sizes=None, **kwargs) -> QuestionPool:
+    sizes = sizes or {RANDOM_MODE: (4, 1), "chorus": (1, 0), "default": (1, 0)}
+    return QuestionPool(generator, PoolConfig(sizes=sizes, **kwargs))
+
+
+def test_miss_then_refill_to_size():
+    generator = Generator()
+    pool = make_pool(generator)
+    assert pool.take(RANDOM_KEY) is None
+    settle(pool)
+    assert generator.calls[RANDOM_KEY] == 4
+    stats = pool.stats()["modes"][RANDOM_MODE]
+    assert (stats["ready"], stats["misses"], stats["generated"]) == (4, 1, 4)
+
+
+def test_mode_key_refills_at_low_watermark():
+    generator = Generator()
+    pool = make_pool(generator)
+    pool.prefetch(RANDOM_KEY)
+    settle(pool)
+    assert [pool.take(RANDOM_KEY)["n"] for _ in range(2)] == [1, 2]
+    settle(pool)
+    assert generator.calls[RANDOM_KEY] == 4  # 2 left, above the watermark of 1
+    assert pool.take(RANDOM_KEY)["n"] == 3
+    settle(pool)
+    assert generator.calls[RANDOM_KEY] == 7  # topped back up to 4
+    assert pool.stats()["modes"][RANDOM_MODE]["hits"] == 3
+
+
+def test_line_position_key_is_not_refilled_after_take():
+    generator = Generator()
+    pool = make_pool(generator)
+    key = ("chorus", "Love Story", 3)
+    assert not QuestionPool.refills(key) and QuestionPool.refills(RANDOM_KEY)
+    pool.prefetch(key)
+    settle(pool)
+    assert pool.take(key) == {"key": key, "n": 1}
+    settle(pool)
+    # The position has been read; generating it again would be wasted work
+    assert generator.calls[key] == 1
+    assert pool.take(key) is None
+    settle(pool)
+    assert generator.calls[key] == 1
+
+
+def test_take_many_counts_hits_and_misses():
+    generator = Generator()
+    pool = make_pool(generator)
+    pool.prefetch(RANDOM_KEY)
+    settle(pool)
+    assert [q["n"] for q in pool.take_many(RANDOM_KEY, 6)] == [1, 2, 3, 4]
+    stats = pool.stats()["modes"][RANDOM_MODE]
+    assert (stats["hits"], stats["misses"]) == (4, 2)
+    assert pool.take_many(RANDOM_KEY, 0) == []
+
+
+def test_least_recently_used_keys_are_dropped():
+    generator = Generator()
+    pool = make_pool(generator, max_keys=2)
+    keys = [("chorus", "Song", i) for i in range(3)]
+    for key in keys:
+        pool.prefetch(key)
+        settle(pool)
+    assert pool.stats()["modes"]["chorus"]["keys"] == 2
+    assert pool.take(keys[0]) is None
+    assert pool.take(keys[2]) is not None
+
+
+def test_failing_generator_is_counted_not_raised():
+    pool = make_pool(Generator(fail=True))
+    pool.prefetch(RANDOM_KEY)
+    settle(pool)
+    stats = pool.stats()["modes"][RANDOM_MODE]
+    assert (stats["failed"], stats["ready"]) == (1, 0)
+
+
+def test_clear_and_disabled():
+    generator = Generator()
+    pool = make_pool(generator)
+    pool.prefetch(RANDOM_KEY)
+    settle(pool)
+    pool.clear()
+    assert pool.stats()["modes"][RANDOM_MODE]["ready"] == 0
+
+    disabled = make_pool(generator, enabled=False)
+    disabled.prefetch(("chorus", "Song", 0))
+    assert disabled.take(RANDOM_KEY) is None and disabled.take_many(RANDOM_KEY, 3) == []
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("QUESTION_POOL_RANDOM_SIZE", "10")
+    monkeypatch.setenv("QUESTION_POOL_RANDOM_LOW", "50")
+    monkeypatch.setenv("QUESTION_POOL_ENABLED", "false")
+    config = PoolConfig.from_env()
+    assert config.limits(RANDOM_MODE) == (10, 10)  # the watermark is capped at the size
+    assert config.limits("chorus") == (1, 0)
+    assert config.limits("unknown part") == config.limits("default")
+    assert not config.enabled
+
+
+@pytest.mark.parametrize("key, mode", [(("random",), "random"), (("Chorus", "Song", 0), "chorus")])
+def test_mode_of(key, mode):
+    assert QuestionPool.mode_of(key) == mode
@@ -0,0 +1,37 @@
+import gzip
+import json
+
+import pytest
+
+from song_catalog import RenderedCatalog, accepts_gzip
+
+SONGS = [{"title": "Lover", "album": "Lover", "parts": ["Bridge"]}]
+
+
+def test_body_gzip_and_etags():
+    rendered = RenderedCatalog(3, SONGS)
+    assert json.loads(rendered.body) == {"songs": SONGS}
+    assert gzip.decompress(rendered.gzip_body) == rendered.body
+    assert rendered.gzip_etag != rendered.etag
+    # Same catalogue, same bytes and tags (as in every worker)
+    again = RenderedCatalog(4, SONGS)
+    assert (again.body, again.gzip_body, again.etag) == (rendered.body, rendered.gzip_body, rendered.etag)
+    assert RenderedCatalog(3, SONGS, compress=False).gzip_body is None
+
+
+def test_not_modified():
+    rendered = RenderedCatalog(1, SONGS)
+    assert rendered.not_modified(rendered.etag)
+    assert rendered.not_modified(f'"other", W/{rendered.gzip_etag}')
+    assert rendered.not_modified("*")
+    assert not rendered.not_modified('"other"')
+    assert not rendered.not_modified(None)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True), ("deflate, gzip;q=0.5", True), ("*", True), ("GZIP;Q=0.1", True),
+    ("gzip;q=0", False), ("gzip;q=0, *", False), ("*;q=0", False), ("gzip;q=abc", False),
+    ("identity", False), ("", False), (None, False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
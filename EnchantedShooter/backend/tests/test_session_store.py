@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+import session_store
+from session_store import GameSession, InMemorySessionStore, SessionConflict, SQLiteSessionStore
+
+
+class Clock:
+    """Stands in for the time module in session_store, so TTLs pass without sleeping."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        kwargs.setdefault("sweep_interval", 3600)
+        if request.param == "memory":
+            return InMemorySessionStore(**kwargs)
+        return SQLiteSessionStore(tmp_path / "sessions.db", **kwargs)
+    return make
+
+
+def add(store, session_id: str) -> GameSession:
+    session = GameSession(session_id)
+    store.add(session)
+    return session
+
+
+def test_get_after_ttl_expires(clock, make_store):
+    store = make_store(ttl_seconds=10)
+    add(store, "a")
+    clock.advance(5)
+    assert store.get("a") is not None
+    clock.advance(11)
+    assert store.get("a") is None
+    assert store.stats()["evicted_ttl"] == 1
+
+
+def test_save_refreshes_ttl(clock, make_store):
+    store = make_store(ttl_seconds=10)
+    add(store, "a")
+    for _ in range(3):
+        clock.advance(8)
+        session = store.get("a")
+        assert session is not None
+        session.score += 1
+        store.save(session)
+    assert store.get("a").score == 103
+
+
+def test_sweep_drops_only_expired(clock, make_store):
+    store = make_store(ttl_seconds=10)
+    add(store, "old")
+    clock.advance(6)
+    add(store, "new")
+    clock.advance(6)
+    assert store.sweep() == 1
+    assert "old" not in store and "new" in store
+    assert len(store) == 1
+
+
+def test_lru_cap_evicts_least_recently_used(clock, make_store):
+    store = make_store(ttl_seconds=0, max_sessions=2)
+    add(store, "a")
+    clock.advance(1)
+    add(store, "b")
+    clock.advance(1)
+    store.save(store.get("a"))  # a is now more recent than b
+    clock.advance(1)
+    add(store, "c")
+    store.sweep()
+    assert "a" in store and "c" in store and "b" not in store
+    assert store.stats()["evicted_lru"] == 1
+
+
+def test_delete(make_store):
+    store = make_store()
+    add(store, "a")
+    assert store.delete("a")
+    assert not store.delete("a")
+    assert store.get("a") is None
+
+
+def test_sqlite_save_from_stale_read_conflicts(tmp_path):
+    store = SQLiteSessionStore(tmp_path / "sessions.db", sweep_interval=3600)
+    add(store, "a")
+    first, second = store.get("a"), store.get("a")
+    first.score = 1
+    store.save(first)
+    second.score = 2
+    with pytest.raises(SessionConflict):
+        store.save(second)
+    assert store.get("a").score == 1
+
+
+def test_sqlite_sessions_are_shared_between_stores(tmp_path):
+    path = tmp_path / "sessions.db"
+    first = SQLiteSessionStore(path, sweep_interval=3600)
+    second = SQLiteSessionStore(path, sweep_interval=3600)
+    session = add(first, "a")
+    session.pending_questions = None
+    session.current_question = {"question": "q", "correct_answer": "w"}
+    session.song_title, session.song_part, session.part_index = "Song", "Chorus", 4
+    first.save(session)
+    loaded = second.get("a")
+    assert loaded.current_question == {"question": "q", "correct_answer": "w"}
+    assert (loaded.song_title, loaded.song_part, loaded.part_index) == ("Song", "Chorus", 4)
+    assert loaded.version == session.version == 1
@@ -0,0 +1,57 @@
+from conftest import LINES
+from corpus_store import CorpusStore
+from song_index import SongPartIndex
+
+
+def line_of(question):
+    return question["incomplete_lyric"].replace("___", question["correct_answer"], 1)
+
+
+def test_part_lines_in_order_without_short_lines(album_json):
+    store = CorpusStore.from_album_json(album_json)
+    index = SongPartIndex(store)
+    never_ever = store.find_song("never ever")
+    # By Order, and "oh oh" has fewer than three words
+    assert [store.line_text(i) for i in index.lines(never_ever, "VERSE")] == [LINES[0], LINES[1]]
+    assert [store.line_text(i) for i in index.lines(never_ever, "chorus")] == [LINES[4]]
+    assert index.lines(never_ever, "bridge") == ()
+    first = index.lines(never_ever, "verse")[0]
+    assert index.tokens(first) == tuple(LINES[0].split())
+    indexed = [LINES[0], LINES[1], LINES[4], *LINES[2:]]
+    assert index.stats() == {"song_parts": 3, "lines": 8, "tokens": sum(len(line.split()) for line in indexed)}
+
+
+def test_add_songs_indexes_only_the_new_songs(album_json):
+    store = CorpusStore.from_album_json(album_json)
+    index = SongPartIndex(store)
+    song_ids = store.add_album({"Code": "NEW", "Title": "New", "Songs": [
+        {"Title": "Brand New", "Lyrics": [{"Order": 1, "Text": "a brand new bridge line", "SongPart": "Bridge"}]},
+    ]})
+    assert index.add_songs(song_ids) == 1
+    assert [store.line_text(i) for i in index.lines(song_ids[0], "Bridge")] == ["a brand new bridge line"]
+
+
+def test_session_cursor_walks_the_part_in_order_and_wraps(manager):
+    session_id = manager.create_session()
+    played = [line_of(manager.get_question(session_id, "Never Ever", "medium")) for _ in range(5)]
+    assert played == [LINES[0], LINES[1], LINES[0], LINES[1], LINES[0]]
+    session = manager.sessions.get(session_id)
+    assert (session.song_title, session.song_part, session.part_index) == ("never ever", "Verse", 1)
+
+
+def test_cursor_restarts_when_song_or_part_changes(manager):
+    session_id = manager.create_session()
+    manager.get_question(session_id, "never ever", "verse")
+    assert line_of(manager.get_question(session_id, "never ever", "chorus")) == LINES[4]
+    shake = [line_of(q) for q in manager.get_questions(session_id, 3, "Shake", "easy")]
+    assert shake == LINES[2:5]
+    assert manager.sessions.get(session_id).part_index == 3
+    # Back to the first part: starts over
+    assert line_of(manager.get_question(session_id, "never ever", "verse")) == LINES[0]
+
+
+def test_unknown_song_or_part_falls_back_to_a_random_question(manager):
+    session_id = manager.create_session()
+    assert manager.get_question(session_id, "No Such Song", "verse") is not None
+    assert manager.get_question(session_id, "Shake", "bridge") is not None
+    assert manager.sessions.get(session_id).song_title is None
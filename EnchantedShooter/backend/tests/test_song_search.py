@@ -0,0 +1,80 @@
+import pytest
+
+from song_catalog import SongSearchIndex, edit_distance, parse_fields
+
+SONGS = [
+    {"title": "Love Story", "album": "Fearless", "parts": ["Verse 1", "Chorus"]},
+    {"title": "Fearless", "album": "Fearless", "parts": ["Chorus"]},
+    {"title": "Shake It Off", "album": "1989", "parts": ["Chorus", "Bridge"]},
+    {"title": "Blank Space", "album": "1989", "parts": ["Verse 1"]},
+    {"title": "Lover", "album": "Lover", "parts": ["Bridge"]},
+    {"title": "Café Lights", "album": "Évermore", "parts": ["Verse 1"]},
+]
+
+
+@pytest.fixture
+def index():
+    return SongSearchIndex(1, SONGS)
+
+
+def titles(index, query, **kwargs):
+    return [song["title"] for song in index.page(query, **kwargs)["songs"]]
+
+
+def test_exact_title_match_ranks_above_album_match(index):
+    assert titles(index, "fearless") == ["Fearless", "Love Story"]
+
+
+def test_prefix_matches_while_typing(index):
+    assert set(titles(index, "lov")) == {"Love Story", "Lover"}
+    assert titles(index, "sha") == ["Shake It Off"]
+    assert titles(index, "shake of") == ["Shake It Off"]
+
+
+def test_typos_match_within_edit_budget(index):
+    assert titles(index, "fearles") == ["Fearless", "Love Story"]  # prefix
+    assert titles(index, "faerless") == ["Fearless", "Love Story"]  # transposition
+    assert titles(index, "blnak") == ["Blank Space"]
+    assert titles(index, "xyzzy") == []
+    # Too short to allow typos
+    assert titles(index, "lx") == []
+
+
+def test_accents_and_case_are_folded(index):
+    assert titles(index, "CAFE") == ["Café Lights"]
+    assert titles(index, "evermore") == ["Café Lights"]
+
+
+def test_every_query_word_must_match(index):
+    assert titles(index, "love story") == ["Love Story"]
+    assert titles(index, "love space") == []
+
+
+def test_pagination(index):
+    everything = index.page("", limit=100)
+    assert everything["total"] == len(SONGS)
+    pages = [index.page("", offset=offset, limit=2) for offset in range(0, len(SONGS), 2)]
+    assert [s for page in pages for s in page["songs"]] == everything["songs"]
+    assert all(len(page["songs"]) == 2 for page in pages)
+    assert index.page("", offset=len(SONGS), limit=2)["songs"] == []
+
+    page = index.page("1989", offset=1, limit=1, fields=("title",))
+    assert page["total"] == 2 and page["songs"] == [{"title": "Blank Space"}]
+
+
+def test_results_are_cached(index):
+    first = index.search("lover")
+    assert index.search("LOVER") is first
+
+
+def test_edit_distance_limit():
+    assert edit_distance("fearless", "faerless", 2) == 1
+    assert edit_distance("kitten", "sittin", 2) == 2
+    assert edit_distance("abc", "xyzuvw", 2) == 3
+
+
+def test_parse_fields():
+    assert parse_fields(None) == ("title", "album", "parts")
+    assert parse_fields("title, album,title") == ("title", "album")
+    with pytest.raises(ValueError):
+        parse_fields("title,lyrics")
@@ -0,0 +1,73 @@
+import threading
+
+from vocab_index import LengthBucketIndex
+
+
+def test_add_appends_new_words_only():
+    index = LengthBucketIndex(["Love", "story", "the"])
+    buckets, words = index.buckets, index.words
+    assert index.add(["LOVE", "tale", "", "tale", "daylight"]) == 2
+    # The same lists grow in place; nothing is rebuilt
+    assert index.buckets is buckets and index.words is words
+    assert index.buckets[4] == ["love", "tale"]
+    assert index.buckets[8] == ["daylight"]
+    assert index.words == ["love", "story", "the", "daylight", "tale"]
+    assert len(index) == 5
+    assert index.add(["tale", "Daylight"]) == 0
+
+
+def test_added_words_are_drawn():
+    index = LengthBucketIndex(["aaaa"])
+    index.add(["bbbb", "cccc"])
+    assert sorted(index.sample(4, 3, spread=0)) == ["aaaa", "bbbb", "cccc"]
+
+
+def test_sampling_while_adding():
+    index = LengthBucketIndex(f"w{i:04d}" for i in range(100))
+    errors = []
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            try:
+                assert len(index.sample(5, 4)) == 4
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    reader = threading.Thread(target=sample)
+    reader.start()
+    for i in range(2000):
+        index.add([f"x{i:04d}"])
+    stop.set()
+    reader.join()
+    assert not errors
+    assert len(index) == 2100
+
+
+def test_words_are_case_folded_and_bucketed_by_length():
+    index = LengthBucketIndex(["Love", "LOVE", "story", "", "the", "Été"])
+    assert index.words == ["love", "story", "the", "été"]
+    assert index.buckets == {4: ["love"], 5: ["story"], 3: ["the", "été"]}
+
+
+def test_sample_prefers_similar_lengths():
+    words = ["aa", "bbb", "cccc", "ddddd", "eeeeeeeeee", "ffffffffff"]
+    index = LengthBucketIndex(words)
+    for _ in range(50):
+        assert set(index.sample(10, 2, spread=0)) == {"eeeeeeeeee", "ffffffffff"}
+        assert set(index.sample(3, 3, spread=1)) == {"aa", "bbb", "cccc"}
+
+
+def test_sample_is_distinct_and_honours_exclude():
+    index = LengthBucketIndex(["aaaa", "bbbb", "cccc", "dddd"])
+    for _ in range(50):
+        picked = index.sample(4, 3, exclude={"aaaa"})
+        assert len(picked) == len(set(picked)) == 3
+        assert "aaaa" not in picked
+
+
+def test_sample_falls_back_to_the_whole_vocabulary():
+    index = LengthBucketIndex(["a", "bb", "verylongword"])
+    assert sorted(index.sample(12, 3, spread=0)) == ["a", "bb", "verylongword"]
+    # Never more than there is
+    assert len(index.sample(1, 10)) == 3